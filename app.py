@@ -1,37 +1,151 @@
 from __future__ import annotations
 
 import argparse
-import datetime as dt
+import asyncio
+import functools
+import importlib
+import itertools
+import operator
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-from price_tracker.db import connect, init_db, transaction
+from price_tracker.db import connect, connect_read_only, ensure_schema, init_db, transaction
 from price_tracker.repos import StoreRepo, CanonicalItemRepo, StoreItemRepo, ObservationRepo
 
 import os
 import subprocess
+import sys
 import json
 from collections import defaultdict
-from typing import Any
+from typing import Any, Callable, NamedTuple
+from urllib.parse import urlparse
+from urllib.request import OpenerDirector
 
-from price_tracker.utils import compute_normalized_unit_price
+# use orjson if installed (C parser/encoder), otherwise the stdlib json module
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+from price_tracker.scrapers import SCRAPER_NAMES
+from price_tracker.scrapers.html_utils import build_opener
+from price_tracker.utils import compute_normalized_unit_price, normalized_quantity, normalized_unit_price_sql
 
 # ---------- Scraper dispatch ----------
 
-def scrape_url(scraper: str, url: str, *, verify_ssl: bool = True):
-    scraper = scraper.lower().strip()
-    if scraper == "mercator":
-        from price_tracker.scrapers.mercator import scrape
-        return scrape(url, verify_ssl=verify_ssl)
-    if scraper == "hofer":
-        from price_tracker.scrapers.hofer import scrape
-        return scrape(url, verify_ssl=verify_ssl)
-    if scraper == "lidl":
-        from price_tracker.scrapers.lidl import scrape
-        return scrape(url, verify_ssl=verify_ssl)
-    if scraper == "spar":
-        from price_tracker.scrapers.spar import scrape
-        return scrape(url, verify_ssl=verify_ssl)
-    raise SystemExit(f"Unknown scraper '{scraper}'. Expected: hofer | mercator | lidl | spar")
+# scraper name -> scrape function, filled lazily (only scrapers that are actually used get imported)
+_SCRAPERS: dict[str, Callable[..., tuple[int, str]]] = {}
+
+
+def _load_scraper(scraper: str) -> Callable[..., tuple[int, str]]:
+    # ValueError (not SystemExit): during scrape-all a bad key must fail only its own item
+    key = scraper.strip().lower()  # legacy rows may not be normalized
+    if key not in SCRAPER_NAMES:
+        raise ValueError(f"Unknown scraper '{scraper}'. Expected: {' | '.join(SCRAPER_NAMES)}")
+    fn = _SCRAPERS[scraper] = _SCRAPERS.get(key) or importlib.import_module(f"price_tracker.scrapers.{key}").scrape
+    return fn
+
+
+def scrape_url(scraper: str, url: str, *, verify_ssl: bool = True, opener: OpenerDirector | None = None):
+    # scraper keys are normalized (stripped + lowercased) when the mapping is written; misses go through _load_scraper
+    fn = _SCRAPERS.get(scraper) or _load_scraper(scraper)
+    return fn(url, verify_ssl=verify_ssl, opener=opener)
+
+
+# politeness: at most _PER_HOST_CONCURRENCY requests in flight per host, spaced by a min delay
+_PER_HOST_CONCURRENCY = 2
+_HOST_MIN_DELAY_S = {"www.lidl.si": 1.0, "online.spar.si": 1.0}
+_DEFAULT_HOST_MIN_DELAY_S = 0.5
+
+
+def _interleave_by_host(items) -> list[int]:
+    """
+    Indices of items in round-robin order by host, so the first wave hits every store at once.
+    """
+    by_host: dict[str, list[int]] = defaultdict(list)
+    for i, si in enumerate(items):
+        by_host[urlparse(si.url).netloc].append(i)
+    return [i for wave in itertools.zip_longest(*by_host.values()) for i in wave if i is not None]
+
+
+def _scrape_item(si, opener: OpenerDirector, verify_ssl: bool):
+    return scrape_url(si.scraper, si.url, verify_ssl=verify_ssl, opener=opener)
+
+
+async def _scrape_items(
+    items,
+    *,
+    verify_ssl: bool,
+    max_concurrency: int,
+    work: Callable[..., Any] = _scrape_item,
+    on_result: Callable[[int, Any], None] | None = None,
+) -> list:
+    """
+    Scrape all items concurrently (at most max_concurrency in flight, rate limited per host).
+    work(si, opener, verify_ssl) runs in a worker thread (default: scrape_url).
+    Returns one entry per item, in input order: work's result (price_cents, title_raw) or the raised exception.
+    on_result(i, result) is called in input order as soon as item i and all items before it are done,
+    so callers can report progress while later items are still being fetched.
+    """
+    loop = asyncio.get_running_loop()
+    sem = asyncio.Semaphore(max_concurrency)
+    host_sem: dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(_PER_HOST_CONCURRENCY))
+    host_next_ok: dict[str, float] = defaultdict(float)
+    opener = build_opener(verify_ssl)  # one SSL context for the whole run
+
+    results: list = [None] * len(items)
+    ready = [False] * len(items)
+    next_i = 0
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        async def bounded(i):
+            nonlocal next_i
+            si = items[i]
+            host = urlparse(si.url).netloc
+            async with host_sem[host]:
+                # reserve the next slot for this host before sleeping, so concurrent waiters don't collide
+                now = loop.time()
+                start = max(now, host_next_ok[host])
+                host_next_ok[host] = start + _HOST_MIN_DELAY_S.get(host, _DEFAULT_HOST_MIN_DELAY_S)
+                if start > now:
+                    await asyncio.sleep(start - now)
+
+                async with sem:
+                    fn = functools.partial(work, si, opener, verify_ssl)
+                    try:
+                        res = await loop.run_in_executor(pool, fn)
+                    except asyncio.CancelledError:
+                        raise
+                    except BaseException as e:  # incl. SystemExit from a worker: it belongs to this item only
+                        res = e
+
+            results[i] = res
+            ready[i] = True
+            while next_i < len(items) and ready[next_i]:
+                if on_result is not None:
+                    on_result(next_i, results[next_i])
+                next_i += 1
+
+        await asyncio.gather(*(bounded(i) for i in _interleave_by_host(items)))
+
+    return results
+
+
+class _Option(NamedTuple):
+    """One store's latest observation of a pack (cheapest / compare-list)."""
+
+    store: str
+    label: str
+    size: float
+    unit: str
+    url: str
+    observed_on: str
+    price_cents: int
+    norm_val: float
+    norm_unit: str
+
+
+_by_norm_val = operator.attrgetter("norm_val")
 
 
 # ---------- CLI commands ----------
@@ -43,8 +157,11 @@ def cmd_init_db(args):
 
 
 def cmd_track_url(args):
+    if args.scraper.strip().lower() not in SCRAPER_NAMES:
+        raise SystemExit(f"Error: unknown --scraper '{args.scraper}'. Expected: {' | '.join(SCRAPER_NAMES)}")
+
     conn = connect(args.db)
-    init_db(conn, args.schema)
+    ensure_schema(conn, args.schema)
 
     store_repo = StoreRepo(conn)
     canon_repo = CanonicalItemRepo(conn)
@@ -78,113 +195,115 @@ def cmd_track_url(args):
 
 def cmd_scrape_all(args):
     conn = connect(args.db)
-    init_db(conn, args.schema)
+    ensure_schema(conn, args.schema)
 
     store_item_repo = StoreItemRepo(conn)
     obs_repo = ObservationRepo(conn)
 
-    observed_on = args.date or dt.date.today().isoformat()
+    import datetime as dt  # only scrape-all needs dates
+
+    observed_on = args.date
+    if observed_on is None:
+        observed_on = dt.date.today().isoformat()
+    else:
+        # validated once up front, not per row after the whole run was scraped
+        observed_on = observed_on.strip()
+        try:
+            valid = dt.date.fromisoformat(observed_on).isoformat() == observed_on
+        except ValueError:
+            valid = False
+        if not valid:
+            raise SystemExit(f"Error: --date must be YYYY-MM-DD, got {args.date!r}")
 
     items = store_item_repo.list_for_scrape()
     if not items:
         print("No tracked store_items. Use track-url first.")
         return
 
+    if args.max_concurrency < 1:
+        raise SystemExit("Error: --max-concurrency must be >= 1")
+
+    already = obs_repo.observed_store_item_ids(observed_on)
+    to_insert: list[tuple[int, str, int, str | None]] = []
     inserted = skipped = failed = 0
 
-    for si in items:
+    def report(i, res):
+        # called in item order while later items are still being fetched; one line per item, flushed
+        nonlocal inserted, skipped, failed
+        si = items[i]
+        tag = f"{si.family_key} {si.canonical_size:g}{si.canonical_unit}"
         try:
-            price_cents, title_raw = scrape_url(
-                si.scraper,
-                si.url,
-                verify_ssl=not args.insecure_ssl,
-            )
-
-            with transaction(conn):
-                ok = obs_repo.insert_daily(
-                    store_item_id=si.store_item_id,
-                    observed_on=observed_on,
-                    price_cents=int(price_cents),
-                    title_raw=title_raw,
-                )
+            if isinstance(res, Exception):
+                raise res
+            if isinstance(res, BaseException):  # e.g. SystemExit raised by a scraper
+                raise RuntimeError(f"{type(res).__name__}: {res}")
 
-            tag = f"{si.family_key} {si.canonical_size:g}{si.canonical_unit}"
-            if ok:
-                inserted += 1
-                print(f"[INSERT] {observed_on} {si.store_name} {tag}: {price_cents}c")
-            else:
-                skipped += 1
-                print(f"[SKIP]   {observed_on} {si.store_name} {tag}: already observed")
+            price_cents, title_raw = res
+            price_cents = int(price_cents)
+            if price_cents < 0:
+                raise ValueError("price_cents must be >= 0")
 
         except Exception as e:
             failed += 1
-            tag = f"{si.family_key} {si.canonical_size:g}{si.canonical_unit}"
-            print(f"[FAIL]   {si.store_name} {tag} ({si.scraper}) {si.url} :: {e}")
+            print(f"[FAIL]   {si.store_name} {tag} ({si.scraper}) {si.url} :: {e}", flush=True)
+            return
+
+        if si.store_item_id in already:
+            skipped += 1
+            print(f"[SKIP]   {observed_on} {si.store_name} {tag}: already observed", flush=True)
+        else:
+            inserted += 1
+            to_insert.append((si.store_item_id, observed_on, price_cents, title_raw))
+            print(f"[INSERT] {observed_on} {si.store_name} {tag}: {price_cents}c", flush=True)
+
+    # network fetches run concurrently, DB writes stay on this thread (sqlite is single-writer)
+    try:
+        asyncio.run(
+            _scrape_items(
+                items, verify_ssl=not args.insecure_ssl, max_concurrency=args.max_concurrency, on_result=report
+            )
+        )
+    finally:
+        # one prepared INSERT, one commit; also runs on Ctrl-C so results reported so far are kept
+        with transaction(conn):
+            obs_repo.insert_daily_many(to_insert)
+
+    if to_insert:
+        # refresh planner stats so the latest-observation joins keep using the covering index;
+        # analysis_limit keeps this a bounded sample instead of a full table scan
+        conn.execute("PRAGMA analysis_limit = 400;")
+        conn.execute("ANALYZE;")
 
     print(f"Done. inserted={inserted} skipped={skipped} failed={failed}")
 
     if failed > 0 and args.fail_on_error:
         raise SystemExit(2)
 
-def _trend(prev_cents: int, last_cents: int):
-    delta = last_cents - prev_cents
-    if delta > 0:
-        arrow = "↑"
-    elif delta < 0:
-        arrow = "↓"
-    else:
-        arrow = "→"
-    pct = (delta / prev_cents * 100.0) if prev_cents > 0 else 0.0
-    return arrow, delta, pct
-
 def cmd_history(args):
-    conn = connect(args.db)
-    init_db(conn, args.schema)
+    # flags used inside per-row loops, bound once
+    normalized = args.normalized
+    show_title = args.show_title
+
+    conn = connect_read_only(args.db, args.schema)
 
     obs_repo = ObservationRepo(conn)
-    points = obs_repo.history_by_family_key(args.key)
+    points = obs_repo.iter_history_by_family_key(args.key)
 
-    if not points:
+    first = next(points, None)
+    if first is None:
         print(f"No history for family key={args.key}")
         return
 
+    out: list[str] = []  # written once at the end
+
     # ============================================================
     # TREND (zadnji 2 zapisa per store+pack)
     # ============================================================
 
     if args.trend:
-        rows = conn.execute(
-            """
-            SELECT
-              s.name AS store_name,
-              COALESCE(si.label_override, ci.label) AS display_label,
-              ci.size AS canonical_size,
-              ci.unit AS canonical_unit,
-              po.observed_on,
-              po.price_cents
-            FROM price_observation po
-            JOIN store_item si ON si.id = po.store_item_id
-            JOIN store s ON s.id = si.store_id
-            JOIN canonical_item ci ON ci.id = si.canonical_item_id
-            WHERE ci.family_key = ?
-            ORDER BY s.name ASC, ci.unit ASC, ci.size ASC, po.observed_on DESC
-            """,
-            (args.key,),
-        ).fetchall()
-
-        latest2 = {}
-        for r in rows:
-            k = (
-                str(r["store_name"]),
-                str(r["display_label"]),
-                float(r["canonical_size"]),
-                str(r["canonical_unit"]),
-            )
-            latest2.setdefault(k, [])
-            if len(latest2[k]) < 2:
-                latest2[k].append((str(r["observed_on"]), int(r["price_cents"])))
+        trend_rows = obs_repo.trend_by_family_key(args.key)
 
-        print(f"Trend for {args.key} (zadnji 2 opazovanji per store+pack)")
+        out.append(f"Trend for {args.key} (zadnji 2 opazovanji per store+pack)")
 
         hdr = (
             f"{'store':<10}  "
@@ -196,81 +315,68 @@ def cmd_history(args):
             f"{'%':>7}  "
             f"{'range':<23}"
         )
-        if args.normalized:
+        if normalized:
             hdr += f"  {'€/unit':>12}"
 
-        print(hdr)
-        print("-" * len(hdr))
+        out.append(hdr)
+        out.append("-" * len(hdr))
 
-        for (store, label, size, unit), pts in latest2.items():
+        for store, label, size, unit, d1, p1, d2, p2, arrow, delta, pct in trend_rows:
+            # group-invariant columns are formatted once per store+pack
             pack = f"{size:g}{unit}"
             label_col = (label[:35] + "…") if len(label) > 36 else label
+            head = f"{store:<10}  {pack:>6}  {label_col:<35}  "
+
+            eur = p1 / 100.0
+
+            # €/unit is based on the latest price in both branches
+            norm_col = ""
+            if normalized:
+                norm = compute_normalized_unit_price(p1, size, unit)
+                if norm:
+                    nv, nu = norm
+                    norm_col = f"  {f'{nv:>8.2f} €/{nu}':>12}"
+                else:
+                    norm_col = f"  {'':>12}"
 
             # samo en zapis (ni dovolj za trend)
-            if len(pts) < 2:
-                d1, p1 = pts[0]
-                eur = p1 / 100.0
-
-                line = (
-                    f"{store:<10}  "
-                    f"{pack:>6}  "
-                    f"{label_col:<35}  "
+            if p2 is None:
+                out.append(
+                    f"{head}"
                     f"{'n/a':>2}  "
                     f"{eur:>8.2f} €  "
                     f"{'':>8}  "
                     f"{'':>7}  "
-                    f"[{d1}]".ljust(23)
+                    f"[{d1}]"
+                    f"{norm_col}"
                 )
-
-                if args.normalized:
-                    norm = compute_normalized_unit_price(p1, size, unit)
-                    if norm:
-                        nv, nu = norm
-                        line += f"  {f'{nv:>8.2f} €/{nu}':>12}"
-                    else:
-                        line += f"  {'':>12}"
-
-                print(line)
                 continue
 
-            (d1, p1), (d2, p2) = pts[0], pts[1]
-
-            arrow, delta, pct = _trend(p2, p1)
-
-            eur = p1 / 100.0
+            # arrow, delta and pct come precomputed from SQL
             delta_eur = delta / 100.0
             pct_str = f"{pct:+.1f}%"
             range_str = f"[{d2}→{d1}]"
 
-            line = (
-                f"{store:<10}  "
-                f"{pack:>6}  "
-                f"{label_col:<35}  "
+            out.append(
+                f"{head}"
                 f"{arrow:>2}  "
                 f"{eur:>8.2f} €  "
                 f"{delta_eur:>+7.2f} €  "
                 f"{pct_str:>7}  "
                 f"{range_str:<23}"
+                f"{norm_col}"
             )
 
-            if args.normalized:
-                norm = compute_normalized_unit_price(p1, size, unit)
-                if norm:
-                    nv, nu = norm
-                    line += f"  {f'{nv:>8.2f} €/{nu}':>12}"
-                else:
-                    line += f"  {'':>12}"
-
-            print(line)
-
-        print("-" * len(hdr))
-        print()
+        out.append("-" * len(hdr))
+        out.append("")
 
     # ============================================================
     # FULL HISTORY
     # ============================================================
 
-    print(f"History for {args.key} (rows={len(points)})")
+    # row count is only known after streaming; its header line is filled in below
+    count_idx = len(out)
+    out.append("")
 
     hdr = (
         f"{'date':<10}  "
@@ -279,17 +385,29 @@ def cmd_history(args):
         f"{'price':>9}"
     )
 
-    if args.normalized:
+    if normalized:
         hdr += f"  {'€/unit':>12}"
 
     hdr += "  label"
 
-    print(hdr)
-    print("-" * len(hdr))
+    out.append(hdr)
+    out.append("-" * len(hdr))
+
+    # a family has only a handful of packs: pack string and €/unit divisor are computed once per pack
+    packs: dict[tuple[float, str], tuple[str, tuple[float, str] | None]] = {}
 
-    for p in points:
+    n_rows = 0
+    for p in itertools.chain((first,), points):
+        n_rows += 1
         eur = p.price_cents / 100.0
-        pack = f"{p.canonical_size:g}{p.canonical_unit}"
+        pack_key = (p.canonical_size, p.canonical_unit)
+        cached = packs.get(pack_key)
+        if cached is None:
+            cached = packs[pack_key] = (
+                f"{p.canonical_size:g}{p.canonical_unit}",
+                normalized_quantity(p.canonical_size, p.canonical_unit),
+            )
+        pack, qty = cached
         label_col = (
             p.canonical_label[:35] + "…"
             if len(p.canonical_label) > 36
@@ -303,54 +421,73 @@ def cmd_history(args):
             f"{eur:>8.2f} €"
         )
 
-        if args.normalized:
-            norm = compute_normalized_unit_price(
-                p.price_cents,
-                p.canonical_size,
-                p.canonical_unit,
-            )
-            if norm:
-                nv, nu = norm
+        if normalized:
+            if qty:
+                nq, nu = qty
+                nv = eur / nq
                 line += f"  {f'{nv:>8.2f} €/{nu}':>12}"
             else:
                 line += f"  {'':>12}"
 
         line += f"  {label_col}"
 
-        if args.show_title and p.title_raw:
+        if show_title and p.title_raw:
             line += f"  |  {p.title_raw.strip()}"
 
-        print(line)
+        out.append(line)
+
+    out.append("-" * len(hdr))
+    out[count_idx] = f"History for {args.key} (rows={n_rows})"
+
+    sys.stdout.write("\n".join(out) + "\n")
+
+# norm_val / norm_unit CASEs are generated from utils._NORM, so they can't drift from compute_normalized_unit_price
+_NORM_VAL_SQL, _NORM_UNIT_SQL = normalized_unit_price_sql("po.price_cents", "ci.size", "ci.unit")
+
+# latest observation per store_item of one family (?1), ordered by €/unit (unobserved last)
+_CHEAPEST_SQL = """
+  WITH latest AS (
+    SELECT store_item_id, MAX(observed_on) AS observed_on
+    FROM price_observation
+    WHERE store_item_id IN (
+      SELECT si.id
+      FROM store_item si
+      JOIN canonical_item ci ON ci.id = si.canonical_item_id
+      WHERE ci.family_key = ?1
+    )
+    GROUP BY store_item_id
+  )
+  SELECT
+    s.name AS store_name,
+    si.url AS url,
+    COALESCE(si.label_override, ci.label) AS canonical_label,
+    ci.size AS canonical_size,
+    ci.unit AS canonical_unit,
+    po.observed_on AS observed_on,
+    po.price_cents AS price_cents,
+    {norm_val} AS norm_val,
+    {norm_unit} AS norm_unit
+  FROM store_item si
+  JOIN store s ON s.id = si.store_id
+  JOIN canonical_item ci ON ci.id = si.canonical_item_id
+  LEFT JOIN latest l ON l.store_item_id = si.id
+  LEFT JOIN price_observation po
+    ON po.store_item_id = l.store_item_id
+   AND po.observed_on = l.observed_on
+  WHERE ci.family_key = ?1
+  ORDER BY po.price_cents IS NULL, norm_val ASC, s.name ASC, ci.unit ASC, ci.size ASC
+""".format(norm_val=_NORM_VAL_SQL, norm_unit=_NORM_UNIT_SQL)
 
-    print("-" * len(hdr))
 
 def cmd_cheapest(args):
-    conn = connect(args.db)
-    init_db(conn, args.schema)
+    show_all = args.show_all
+    show_url = args.show_url
+
+    conn = connect_read_only(args.db, args.schema)
 
+    # latest date per store_item is aggregated once (family items only), not per row
     rows = conn.execute(
-        """
-        SELECT
-          s.name AS store_name,
-          si.url AS url,
-          COALESCE(si.label_override, ci.label) AS canonical_label,
-          ci.size AS canonical_size,
-          ci.unit AS canonical_unit,
-          po.observed_on AS observed_on,
-          po.price_cents AS price_cents
-        FROM store_item si
-        JOIN store s ON s.id = si.store_id
-        JOIN canonical_item ci ON ci.id = si.canonical_item_id
-        LEFT JOIN price_observation po
-          ON po.store_item_id = si.id
-         AND po.observed_on = (
-              SELECT MAX(observed_on)
-              FROM price_observation
-              WHERE store_item_id = si.id
-         )
-        WHERE ci.family_key = ?
-        ORDER BY s.name ASC, ci.unit ASC, ci.size ASC
-        """,
+        _CHEAPEST_SQL,
         (args.key,),
     ).fetchall()
 
@@ -361,37 +498,16 @@ def cmd_cheapest(args):
     observed = []
     missing = []
 
-    for r in rows:
-        store = str(r["store_name"])
-        size = float(r["canonical_size"])
-        unit = str(r["canonical_unit"])
-        label = str(r["canonical_label"])
-        url = str(r["url"])
-
-        if r["price_cents"] is None:
+    # rows are already sorted by €/unit (unobserved last)
+    for store, url, label, size, unit, observed_on, price_cents, norm_val, norm_unit in rows:
+        if price_cents is None:
             missing.append(f"{store} {size:g}{unit}")
             continue
 
-        price_cents = int(r["price_cents"])
-        eur = price_cents / 100.0
+        if observed and not show_all:
+            continue  # only the best option gets printed
 
-        norm = compute_normalized_unit_price(price_cents, size, unit)
-        if not norm:
-            norm_val, norm_unit = eur, unit
-        else:
-            norm_val, norm_unit = norm
-
-        observed.append({
-            "store": store,
-            "size": size,
-            "unit": unit,
-            "label": label,
-            "eur": eur,
-            "observed_on": str(r["observed_on"]),
-            "url": url,
-            "norm_val": float(norm_val),
-            "norm_unit": norm_unit,
-        })
+        observed.append(_Option(store, label, size, unit, url, observed_on, price_cents, norm_val, norm_unit))
 
     if not observed:
         print(f"No observations yet for family key={args.key}.")
@@ -399,44 +515,77 @@ def cmd_cheapest(args):
             print("Missing:", ", ".join(missing))
         return
 
-    observed.sort(key=lambda x: x["norm_val"])
     best = observed[0]
-
-    print(f"Cheapest for {args.key} (by €/{best['norm_unit']})")
-    print("-" * 110)
-    print(
-        f"{best['store']:<10}  {best['size']:g}{best['unit']:<3}  "
-        f"{best['eur']:>7.2f} €  {best['label']:<45}  "
-        f"({best['norm_val']:.2f} €/{best['norm_unit']})  [{best['observed_on']}]"
+    out: list[str] = []  # written once at the end
+
+    out.append(f"Cheapest for {args.key} (by €/{best.norm_unit})")
+    out.append("-" * 110)
+    out.append(
+        f"{best.store:<10}  {best.size:g}{best.unit:<3}  "
+        f"{best.price_cents / 100.0:>7.2f} €  {best.label:<45}  "
+        f"({best.norm_val:.2f} €/{best.norm_unit})  [{best.observed_on}]"
     )
 
-    if args.show_url:
-        print(f"url: {best['url']}")
+    if show_url:
+        out.append(f"url: {best.url}")
 
-    if args.show_all:
-        print("-" * 110)
-        print("Latest options:")
+    if show_all:
+        out.append("-" * 110)
+        out.append("Latest options:")
         for x in observed:
-            print(
-                f"{x['store']:<10}  {x['size']:g}{x['unit']:<3}  "
-                f"{x['eur']:>7.2f} €  {x['label']:<45}  "
-                f"({x['norm_val']:.2f} €/{x['norm_unit']})  [{x['observed_on']}]"
+            out.append(
+                f"{x.store:<10}  {x.size:g}{x.unit:<3}  "
+                f"{x.price_cents / 100.0:>7.2f} €  {x.label:<45}  "
+                f"({x.norm_val:.2f} €/{x.norm_unit})  [{x.observed_on}]"
             )
 
     if missing:
-        print("-" * 110)
-        print("Missing (tracked but no observations yet):", ", ".join(sorted(set(missing))))
+        out.append("-" * 110)
+        out.append("Missing (tracked but no observations yet): " + ", ".join(sorted(set(missing))))
+
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def _run(cmd: list[str]) -> subprocess.CompletedProcess:
     return subprocess.run(cmd, text=True, capture_output=True)
 
 
+def _upstream_matches_head() -> bool:
+    """
+    True if HEAD already equals the upstream branch tip on the remote (no pull needed).
+    Any problem (no upstream, offline, ...) returns False so the caller just pulls.
+    """
+    branch = _run(["git", "symbolic-ref", "--quiet", "--short", "HEAD"]).stdout.strip()
+    if not branch:
+        return False
+    remote = _run(["git", "config", f"branch.{branch}.remote"]).stdout.strip()
+    merge_ref = _run(["git", "config", f"branch.{branch}.merge"]).stdout.strip()
+    if not remote or not merge_ref:
+        return False
+
+    # local rev-parse and the network round trip run side by side
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        head = pool.submit(_run, ["git", "rev-parse", "HEAD"])
+        remote_tip = pool.submit(_run, ["git", "ls-remote", "--exit-code", remote, merge_ref])
+        head, remote_tip = head.result(), remote_tip.result()
+
+    if head.returncode != 0 or remote_tip.returncode != 0:
+        return False
+    remote_sha = remote_tip.stdout.split()[0] if remote_tip.stdout.strip() else ""
+    return remote_sha == head.stdout.strip()
+
+
 def cmd_sync(args):
     if not os.path.isdir(".git"):
         print("Not a git repo (missing .git). Sync works only inside a git repository.")
         return
 
+    if _upstream_matches_head():
+        # nothing to fetch: skip the pull (and its object negotiation) entirely
+        print("Already up to date.")
+        _print_db_latest(args)
+        return
+
     def do_pull() -> subprocess.CompletedProcess:
         pull_cmd = ["git", "pull", "--ff-only"]
         print("$ " + " ".join(pull_cmd))
@@ -478,9 +627,12 @@ def cmd_sync(args):
     out = (res.stdout or "").strip()
     print(out if out else "Already up to date.")
 
+    _print_db_latest(args)
+
+
+def _print_db_latest(args) -> None:
     if getattr(args, "show_db", False):
-        conn = connect(args.db)
-        init_db(conn, args.schema)
+        conn = connect_read_only(args.db, args.schema)
         row = conn.execute("SELECT MAX(observed_on) AS max_day FROM price_observation").fetchone()
         max_day = row["max_day"] if row and row["max_day"] is not None else None
         if max_day:
@@ -489,11 +641,19 @@ def cmd_sync(args):
             print("DB has no observations yet.")
 
 def cmd_list_tracked(args):
-    conn = connect(args.db)
-    init_db(conn, args.schema)
+    normalized = args.normalized
+    show_url = args.show_url
+
+    conn = connect_read_only(args.db, args.schema)
 
+    # latest date per store_item is aggregated once, not re-probed per row
     rows = conn.execute(
         """
+        WITH latest AS (
+          SELECT store_item_id, MAX(observed_on) AS observed_on
+          FROM price_observation
+          GROUP BY store_item_id
+        )
         SELECT
           s.name AS store_name,
           ci.family_key AS family_key,
@@ -507,13 +667,10 @@ def cmd_list_tracked(args):
         FROM store_item si
         JOIN store s ON s.id = si.store_id
         JOIN canonical_item ci ON ci.id = si.canonical_item_id
+        LEFT JOIN latest l ON l.store_item_id = si.id
         LEFT JOIN price_observation po
-          ON po.store_item_id = si.id
-         AND po.observed_on = (
-            SELECT MAX(observed_on)
-            FROM price_observation
-            WHERE store_item_id = si.id
-         )
+          ON po.store_item_id = l.store_item_id
+         AND po.observed_on = l.observed_on
         ORDER BY s.name, ci.family_key, ci.unit, ci.size
         """
     ).fetchall()
@@ -522,13 +679,12 @@ def cmd_list_tracked(args):
         print("No tracked store_items.")
         return
 
-    print("Tracked items")
-    print("-" * 120)
+    out = ["Tracked items", "-" * 120]
 
     for r in rows:
         store = r["store_name"]
         family = r["family_key"]
-        size = float(r["size"])
+        size = r["size"]
         unit = r["unit"]
         label = r["display_label"]
         scraper = r["scraper"]
@@ -541,25 +697,29 @@ def cmd_list_tracked(args):
         if price_cents is None:
             line += "(no observations)"
         else:
-            eur = int(price_cents) / 100.0
+            eur = price_cents / 100.0
             line += f"{eur:>7.2f} €  [{observed_on}]"
 
-            if args.normalized:
-                norm = compute_normalized_unit_price(int(price_cents), size, unit)
+            if normalized:
+                norm = compute_normalized_unit_price(price_cents, size, unit)
                 if norm:
                     nv, nu = norm
                     line += f"  ({nv:.2f} €/{nu})"
 
-        print(line)
+        out.append(line)
 
-        if args.show_url:
-            print(f"    scraper={scraper}  url={url}")
+        if show_url:
+            out.append(f"    scraper={scraper}  url={url}")
 
-    print("-" * 120)
+    out.append("-" * 120)
+    sys.stdout.write("\n".join(out) + "\n")
 
 def cmd_doctor(args):
-    conn = connect(args.db)
-    init_db(conn, args.schema)
+    normalized = args.normalized
+    show_title = args.show_title
+    show_url = args.show_url
+
+    conn = connect_read_only(args.db, args.schema)
 
     repo = StoreItemRepo(conn)
     items = repo.list_for_scrape()
@@ -584,40 +744,54 @@ def cmd_doctor(args):
         print("No matching tracked store_items for given filters.")
         return
 
+    if args.workers < 1:
+        raise SystemExit("Error: --workers must be >= 1")
+
     ok = fail = 0
     print(f"Doctor check (items={len(items)})")
     print("-" * 120)
 
-    for si in items:
-        label = f"{si.family_key} {si.canonical_size:g}{si.canonical_unit} ({si.store_name})"
+    def timed_scrape(si, opener, verify_ssl):
+        # timing is taken inside the worker so it measures the fetch, not the queueing/pacing
         t0 = time.perf_counter()
         try:
-            price_cents, title_raw = scrape_url(
-                si.scraper,
-                si.url,
-                verify_ssl=not args.insecure_ssl,
-            )
-            ms = int((time.perf_counter() - t0) * 1000)
+            price_cents, title_raw = scrape_url(si.scraper, si.url, verify_ssl=verify_ssl, opener=opener)
+            err = None
+        except Exception as e:
+            price_cents = title_raw = None
+            err = e
+        ms = int((time.perf_counter() - t0) * 1000)
+        return price_cents, title_raw, ms, err
+
+    # same per-host limits and pacing as scrape-all; results come back in item order
+    results = asyncio.run(
+        _scrape_items(items, verify_ssl=not args.insecure_ssl, max_concurrency=args.workers, work=timed_scrape)
+    )
+
+    for si, (price_cents, title_raw, ms, err) in zip(items, results):
+        label = f"{si.family_key} {si.canonical_size:g}{si.canonical_unit} ({si.store_name})"
+        try:
+            if err is not None:
+                raise err
             eur = int(price_cents) / 100.0
 
             norm_str = ""
-            if args.normalized:
+            if normalized:
                 norm = compute_normalized_unit_price(int(price_cents), si.canonical_size, si.canonical_unit)
                 if norm:
                     nv, nu = norm
                     norm_str = f"  ({nv:.2f} €/{nu})"
 
             print(f"[OK]   {label:<45}  {eur:>7.2f} €{norm_str}  {ms}ms")
-            if args.show_title and title_raw:
+            if show_title and title_raw:
                 print(f"       title={title_raw.strip()}")
-            if args.show_url:
+            if show_url:
                 print(f"       scraper={si.scraper} url={si.url}")
             ok += 1
 
         except Exception as e:
-            ms = int((time.perf_counter() - t0) * 1000)
             print(f"[FAIL] {label:<45}  {ms}ms  :: {e}")
-            if args.show_url:
+            if show_url:
                 print(f"       scraper={si.scraper} url={si.url}")
             fail += 1
 
@@ -628,13 +802,47 @@ def cmd_doctor(args):
     if fail > 0 and args.fail_on_error:
         raise SystemExit(2)
 
+# latest observation per store_item for a set of family keys; {placeholders} is one "?" per key
+_COMPARE_LIST_SQL = """
+  WITH latest AS (
+    SELECT store_item_id, MAX(observed_on) AS observed_on
+    FROM price_observation
+    WHERE store_item_id IN (
+      SELECT si.id
+      FROM store_item si
+      JOIN canonical_item ci ON ci.id = si.canonical_item_id
+      WHERE ci.family_key IN ({placeholders})
+    )
+    GROUP BY store_item_id
+  )
+  SELECT
+    s.id AS store_id,
+    s.name AS store_name,
+    ci.family_key AS family_key,
+    COALESCE(si.label_override, ci.label) AS label,
+    ci.size AS size,
+    ci.unit AS unit,
+    si.url AS url,
+    po.observed_on AS observed_on,
+    po.price_cents AS price_cents
+  FROM store_item si
+  JOIN store s ON s.id = si.store_id
+  JOIN canonical_item ci ON ci.id = si.canonical_item_id
+  LEFT JOIN latest l ON l.store_item_id = si.id
+  LEFT JOIN price_observation po
+    ON po.store_item_id = l.store_item_id
+   AND po.observed_on = l.observed_on
+  WHERE ci.family_key IN ({placeholders})
+"""
+
+
 def cmd_compare_list(args):
-    conn = connect(args.db)
-    init_db(conn, args.schema)
+    show_url = args.show_url
+
+    conn = connect_read_only(args.db, args.schema)
 
     # load list
-    with open(args.list, "r", encoding="utf-8") as f:
-        payload = json.load(f)
+    payload = _read_json(args.list)
 
     items = payload.get("items", [])
     if not isinstance(items, list) or not items:
@@ -666,125 +874,113 @@ def cmd_compare_list(args):
         return
 
     # Prepare output accumulators per store
-    per_store_total_cents = {int(s["id"]): 0 for s in stores}
-    per_store_missing = {int(s["id"]): [] for s in stores}
-    per_store_lines = {int(s["id"]): [] for s in stores}
+    per_store_total_cents = {s["id"]: 0 for s in stores}
+    per_store_missing = {s["id"]: [] for s in stores}
+    per_store_lines = {s["id"]: [] for s in stores}
+
+    # latest observed options for every requested family_key in one query (across packs)
+    keys = list(dict.fromkeys(k for k, _ in want))
+    placeholders = ",".join("?" * len(keys))
+    rows = conn.execute(_COMPARE_LIST_SQL.format(placeholders=placeholders), keys + keys).fetchall()
+
+    # group by family_key -> store_id; cheapest by normalized €/unit is picked per list item below
+    options_by_family_store: dict[str, dict[int, list[_Option]]] = defaultdict(lambda: defaultdict(list))
+    pack_qty: dict[tuple[float, str], tuple[float, str] | None] = {}  # (size, unit) repeats across stores
+    for r in rows:
+        store_id = r["store_id"]
+        if r["price_cents"] is None:
+            continue
+        price_cents = r["price_cents"]
+        size = r["size"]
+        unit = r["unit"]
+        pack = (size, unit)
+        if pack not in pack_qty:
+            pack_qty[pack] = normalized_quantity(size, unit)
+        qty_norm = pack_qty[pack]
+        if not qty_norm:
+            # if unsupported unit, fallback to pack price (still works, but less meaningful)
+            norm_val, norm_unit = price_cents / 100.0, unit
+        else:
+            norm_val, norm_unit = price_cents / 100.0 / qty_norm[0], qty_norm[1]
 
-    # For each requested family_key, pick best option per store
-    for family_key, qty in want:
-        # latest observed options per store for this family_key (across packs)
-        rows = conn.execute(
-            """
-            SELECT
-              s.id AS store_id,
-              s.name AS store_name,
-              ci.family_key AS family_key,
-              COALESCE(si.label_override, ci.label) AS label,
-              ci.size AS size,
-              ci.unit AS unit,
-              si.url AS url,
-              po.observed_on AS observed_on,
-              po.price_cents AS price_cents
-            FROM store_item si
-            JOIN store s ON s.id = si.store_id
-            JOIN canonical_item ci ON ci.id = si.canonical_item_id
-            LEFT JOIN price_observation po
-              ON po.store_item_id = si.id
-             AND po.observed_on = (
-                  SELECT MAX(observed_on)
-                  FROM price_observation
-                  WHERE store_item_id = si.id
-             )
-            WHERE ci.family_key = ?
-            """,
-            (family_key,),
-        ).fetchall()
-
-        # group by store_id and pick cheapest by normalized €/unit
-        options_by_store = defaultdict(list)
-        for r in rows:
-            store_id = int(r["store_id"])
-            if r["price_cents"] is None:
-                continue
-            price_cents = int(r["price_cents"])
-            size = float(r["size"])
-            unit = str(r["unit"])
-            norm = compute_normalized_unit_price(price_cents, size, unit)
-            if not norm:
-                # if unsupported unit, fallback to pack price (still works, but less meaningful)
-                norm_val, norm_unit = price_cents / 100.0, unit
-            else:
-                norm_val, norm_unit = norm
-
-            options_by_store[store_id].append(
-                {
-                    "store_name": str(r["store_name"]),
-                    "family_key": str(r["family_key"]),
-                    "label": str(r["label"]),
-                    "size": size,
-                    "unit": unit,
-                    "url": str(r["url"]),
-                    "observed_on": str(r["observed_on"]),
-                    "price_cents": price_cents,
-                    "norm_val": float(norm_val),
-                    "norm_unit": norm_unit,
-                }
-            )
+        options_by_family_store[r["family_key"]][store_id].append(
+            _Option(r["store_name"], r["label"], size, unit, r["url"], r["observed_on"], price_cents, norm_val, norm_unit)
+        )
 
-        for s in stores:
-            sid = int(s["id"])
-            sname = str(s["name"])
+    # For each requested family_key, pick best option per store that has one; the rest are missing
+    store_ids = {s["id"] for s in stores}
+    for family_key, qty in want:
+        by_store = options_by_family_store.get(family_key, {})
 
-            opts = options_by_store.get(sid, [])
-            if not opts:
-                per_store_missing[sid].append(f"{family_key} x{qty}")
-                continue
+        for sid in store_ids - by_store.keys():
+            per_store_missing[sid].append(f"{family_key} x{qty}")
 
-            best = min(opts, key=lambda x: x["norm_val"])
-            line_total = best["price_cents"] * qty
+        for sid, opts in by_store.items():
+            best = min(opts, key=_by_norm_val)
+            line_total = best.price_cents * qty
             per_store_total_cents[sid] += line_total
 
-            price_eur = best["price_cents"] / 100.0
+            price_eur = best.price_cents / 100.0
             line_total_eur = line_total / 100.0
-            per_unit = f"{best['norm_val']:.2f} €/{best['norm_unit']}"
+            per_unit = f"{best.norm_val:.2f} €/{best.norm_unit}"
 
             per_store_lines[sid].append(
                 f"- {family_key:<12} x{qty:<2}  "
-                f"{best['size']:g}{best['unit']:<3} {price_eur:>7.2f} €  "
-                f"({per_unit})  -> {line_total_eur:>7.2f} €   [{best['observed_on']}]  {best['label']}"
-                + (f"\n    {best['url']}" if args.show_url else "")
+                f"{best.size:g}{best.unit:<3} {price_eur:>7.2f} €  "
+                f"({per_unit})  -> {line_total_eur:>7.2f} €   [{best.observed_on}]  {best.label}"
+                + (f"\n    {best.url}" if show_url else "")
             )
 
     # Print results
-    print(f"Compare list: {args.list}")
-    print("=" * 120)
+    out = [f"Compare list: {args.list}", "=" * 120]
 
     # sort stores by total (missing-heavy stores last)
     def sort_key(sid: int):
         missing_count = len(per_store_missing[sid])
         return (missing_count, per_store_total_cents[sid])
 
-    for s in sorted(stores, key=lambda r: sort_key(int(r["id"]))):
-        sid = int(s["id"])
-        sname = str(s["name"])
+    for s in sorted(stores, key=lambda r: sort_key(r["id"])):
+        sid = s["id"]
+        sname = s["name"]
         total_eur = per_store_total_cents[sid] / 100.0
         missing = per_store_missing[sid]
 
-        print(f"{sname}  total={total_eur:.2f} €   missing={len(missing)}")
-        print("-" * 120)
+        out.append(f"{sname}  total={total_eur:.2f} €   missing={len(missing)}")
+        out.append("-" * 120)
 
         lines = per_store_lines[sid]
         if lines:
-            for ln in lines:
-                print(ln)
+            out.extend(lines)
         else:
-            print("(no matched items)")
+            out.append("(no matched items)")
 
         if missing:
-            print("\nMissing:")
-            for m in missing:
-                print(f"  - {m}")
-        print("=" * 120)
+            out.append("\nMissing:")
+            out.extend(f"  - {m}" for m in missing)
+        out.append("=" * 120)
+
+    sys.stdout.write("\n".join(out) + "\n")
+
+# ---------- Shopping list JSON ----------
+
+def _read_json(path: str) -> Any:
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _dump_json(data: Any) -> str:
+    # 2-space indent, non-ASCII kept as-is, trailing newline. For the shopping-list shapes we write
+    # (str keys, small ints) both give the same text; they differ on some floats (1e20 vs 1e+20).
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8") + "\n"
+        except orjson.JSONEncodeError:
+            pass  # NaN/Infinity, ints over 64 bits, non-str keys: json.dumps still writes them
+    return json.dumps(data, ensure_ascii=False, indent=2) + "\n"
+
 
 def _load_shopping_list(path: str) -> dict[str, Any]:
     path = path.strip()
@@ -794,8 +990,7 @@ def _load_shopping_list(path: str) -> dict[str, Any]:
     if not os.path.exists(path):
         return {"items": []}
 
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = _read_json(path)
 
     if not isinstance(data, dict):
         raise ValueError("shopping list must be a JSON object")
@@ -829,8 +1024,7 @@ def _load_shopping_list(path: str) -> dict[str, Any]:
 def _save_shopping_list(path: str, data: dict[str, Any]) -> None:
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-        f.write("\n")
+        f.write(_dump_json(data))
 
 def cmd_list_show(args):
     data = _load_shopping_list(args.list)
@@ -906,7 +1100,7 @@ def build_parser() -> argparse.ArgumentParser:
     add_db_args(p_track)
     p_track.add_argument("--store", required=True, help="Store name, e.g. Hofer or Mercator")
     p_track.add_argument("--url", required=True)
-    p_track.add_argument("--scraper", required=True, help="Scraper key, e.g. hofer | mercator")
+    p_track.add_argument("--scraper", required=True, help="Scraper key: hofer | mercator | lidl | spar")
     p_track.add_argument("--key", required=True, help="Canonical key, e.g. milk_35_1l")
     p_track.add_argument("--label", required=True, help='Canonical label, e.g. "Mleko 3.5% 1L"')
     p_track.add_argument("--size", required=True, type=float, help="Canonical size (number), e.g. 1")
@@ -919,6 +1113,7 @@ def build_parser() -> argparse.ArgumentParser:
     add_db_args(p_scrape)
     p_scrape.add_argument("--date", default=None, help="Override observed_on (YYYY-MM-DD). Default: today")
     p_scrape.add_argument("--insecure-ssl", action="store_true", help="DEV ONLY: disable SSL certificate verification")
+    p_scrape.add_argument("--max-concurrency", type=int, default=8, help="Max number of URLs fetched in parallel (default: 8)")
     p_scrape.set_defaults(func=cmd_scrape_all)
     p_scrape.add_argument("--fail-on-error", action="store_true", help="Exit with non-zero code if any scrape fails (CI-friendly)",)
 
@@ -961,6 +1156,7 @@ def build_parser() -> argparse.ArgumentParser:
     p_doc.add_argument("--store", default=None, help="Filter by store name (e.g. Mercator)")
     p_doc.add_argument("--key", default=None, help="Filter by family key (e.g. olive_oil)")
     p_doc.add_argument("--limit", type=int, default=None, help="Limit number of checks")
+    p_doc.add_argument("--workers", type=int, default=8, help="Max URLs checked in parallel (default: 8; per-host limits as in scrape-all)")
     p_doc.add_argument("--insecure-ssl", action="store_true", help="DEV ONLY: disable SSL verification")
     p_doc.add_argument("--show-url", action="store_true", help="Print URL + scraper")
     p_doc.add_argument("--show-title", action="store_true", help="Print raw scraped title")
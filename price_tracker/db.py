@@ -1,24 +1,83 @@
 from __future__ import annotations
 
 import contextlib
+import functools
 import sqlite3
 from pathlib import Path
 from typing import Iterator
 
 
-def connect(db_path: str) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path)
+def connect(db_path: str, read_only: bool = False) -> sqlite3.Connection:
+    # Autocommit mode: transactions are only what transaction() opens explicitly, so a repo
+    # write outside it can't leave an implicit BEGIN behind. The larger statement cache keeps
+    # every repo/command query prepared for the life of the connection.
+    if read_only:
+        # mode=ro: reporting paths can't take write locks or touch the journal settings
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, isolation_level=None, cached_statements=256)
+    else:
+        conn = sqlite3.connect(db_path, isolation_level=None, cached_statements=256)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
+
+    if not read_only:
+        # WAL + synchronous=NORMAL: commits append to <db>-wal instead of fsyncing the main file.
+        # The WAL is checkpointed back into the db file when the last connection closes,
+        # so data/prices.sqlite stays self-contained between CLI runs (and for the CI commit).
+        # journal_mode persists in the db file, so re-issuing it on later runs is a no-op.
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
+
+    # per-connection cache settings, fine for read-only connections too
+    conn.execute("PRAGMA temp_store = MEMORY;")
+    conn.execute("PRAGMA cache_size = -65536;")  # 64 MiB
+    conn.execute("PRAGMA mmap_size = 268435456;")  # 256 MiB
     return conn
 
 
+def connect_read_only(db_path: str, schema_path: str = "schema.sql") -> sqlite3.Connection:
+    # Reporting commands only read. A missing or outdated db still gets the schema applied
+    # once through a normal connection, then the command continues read-only.
+    if Path(db_path).exists():
+        conn = connect(db_path, read_only=True)
+        (version,) = conn.execute("PRAGMA user_version;").fetchone()
+        if version == SCHEMA_VERSION:
+            return conn
+        conn.close()
+
+    conn = connect(db_path)
+    ensure_schema(conn, schema_path)
+    conn.close()
+    return connect(db_path, read_only=True)
+
+
+# Bump whenever schema.sql changes, so existing databases re-apply it once.
+SCHEMA_VERSION = 3
+
+
+@functools.lru_cache(maxsize=4)
+def _read_schema(schema_path: str) -> str:
+    # read once per process (tests init many in-memory dbs from the same file)
+    return Path(schema_path).read_text(encoding="utf-8")
+
+
 def init_db(conn: sqlite3.Connection, schema_path: str = "schema.sql") -> None:
-    schema_sql = Path(schema_path).read_text(encoding="utf-8")
-    conn.executescript(schema_sql)
+    conn.executescript(_read_schema(schema_path))
+    # planner stats for the (possibly new) indexes; sampled so it stays cheap on big dbs
+    conn.execute("PRAGMA analysis_limit = 400;")
+    conn.execute("ANALYZE;")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION};")
     conn.commit()
 
 
+def ensure_schema(conn: sqlite3.Connection, schema_path: str = "schema.sql") -> None:
+    # Cheap per-command check: skip reading/executing schema.sql when the db is already current.
+    (version,) = conn.execute("PRAGMA user_version;").fetchone()
+    if version == SCHEMA_VERSION:
+        return
+    init_db(conn, schema_path)
+
+
 @contextlib.contextmanager
 def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
     try:
@@ -27,4 +86,5 @@ def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
         conn.commit()
     except Exception:
         conn.rollback()
-        raise
\ No newline at end of file
+        raise
+
@@ -21,45 +21,20 @@ class CanonicalItemRepo:
         if not unit:
             raise ValueError("canonical unit cannot be empty")
 
-        # Manual upsert (portable across SQLite versions)
+        # one statement: insert or relabel, and hand back the id either way (SQLite >= 3.35)
         row = self.conn.execute(
-            """
-            SELECT id FROM canonical_item
-            WHERE family_key=? AND size=? AND unit=?
-            """,
-            (family_key, float(size), unit),
-        ).fetchone()
-
-        if row:
-            cid = int(row["id"])
-            self.conn.execute(
-                """
-                UPDATE canonical_item
-                SET label=?, size=?, unit=?
-                WHERE id=?
-                """,
-                (label, float(size), unit, cid),
-            )
-            return cid
-
-        self.conn.execute(
             """
             INSERT INTO canonical_item(family_key, label, size, unit)
             VALUES (?, ?, ?, ?)
+            ON CONFLICT(family_key, size, unit) DO UPDATE SET
+              label=excluded.label
+            RETURNING id
             """,
             (family_key, label, float(size), unit),
-        )
-
-        row2 = self.conn.execute(
-            """
-            SELECT id FROM canonical_item
-            WHERE family_key=? AND size=? AND unit=?
-            """,
-            (family_key, float(size), unit),
         ).fetchone()
-        if row2 is None:
-            raise RuntimeError("failed to fetch canonical_item after insert")
-        return int(row2["id"])
+        if row is None:
+            raise RuntimeError("failed to fetch canonical_item after upsert")
+        return int(row["id"])
 
     def get_id_by_family_size_unit(self, family_key: str, size: float, unit: str) -> int | None:
         family_key = family_key.strip()
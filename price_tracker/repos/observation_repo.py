@@ -2,7 +2,8 @@ from __future__ import annotations
 
 import sqlite3
 from dataclasses import dataclass
-from typing import Optional
+from itertools import islice
+from typing import Iterable, Iterator, Optional
 
 
 @dataclass(frozen=True)
@@ -17,6 +18,10 @@ class PricePoint:
     title_raw: Optional[str]
 
 
+def _price_point_row(_cur: sqlite3.Cursor, row: tuple) -> PricePoint:
+    return PricePoint(*row)
+
+
 class ObservationRepo:
     def __init__(self, conn: sqlite3.Connection) -> None:
         self.conn = conn
@@ -43,12 +48,113 @@ class ObservationRepo:
         )
         return cur.rowcount == 1
 
-    def history_by_family_key(self, family_key: str) -> list[PricePoint]:
+    def insert_daily_many(self, rows: Iterable[tuple[int, str, int, Optional[str]]], chunk: int = 500) -> int:
+        """
+        Bulk insert_daily: rows are (store_item_id, observed_on, price_cents, title_raw).
+        rows may be any iterable (e.g. a generator); it is consumed and written `chunk` rows
+        at a time, each chunk validated before it is written. Callers wrap this in transaction(),
+        so a bad row still rolls back the whole batch. Returns the number of rows actually inserted.
+        """
+        if chunk < 1:
+            raise ValueError("chunk must be >= 1")
+
+        total = 0
+        it = iter(rows)
+        while True:
+            checked = []
+            for store_item_id, observed_on, price_cents, title_raw in islice(it, chunk):
+                observed_on = observed_on.strip()
+                if not observed_on:
+                    raise ValueError("observed_on cannot be empty (expected YYYY-MM-DD)")
+                if int(price_cents) < 0:
+                    raise ValueError("price_cents must be >= 0")
+                checked.append((int(store_item_id), observed_on, int(price_cents), title_raw))
+
+            if not checked:
+                return total
+
+            cur = self.conn.executemany(
+                """
+                INSERT OR IGNORE INTO price_observation(store_item_id, observed_on, price_cents, title_raw)
+                VALUES (?, ?, ?, ?)
+                """,
+                checked,
+            )
+            total += cur.rowcount
+
+    def observed_store_item_ids(self, observed_on: str) -> set[int]:
+        rows = self.conn.execute(
+            "SELECT store_item_id FROM price_observation WHERE observed_on = ?",
+            (observed_on.strip(),),
+        ).fetchall()
+        return {int(r["store_item_id"]) for r in rows}
+
+    def trend_by_family_key(
+        self, family_key: str
+    ) -> list[tuple[str, str, float, str, str, int, Optional[str], Optional[int], Optional[str], Optional[int], float]]:
+        """
+        Latest observation per store_item of a family with its predecessor, ordered by store, unit, size:
+        (store_name, display_label, size, unit, last_on, last_cents, prev_on, prev_cents, arrow, delta_cents, pct).
+        prev_*/arrow/delta are None when the store_item has a single observation; pct is 0.0 then
+        (and when the previous price is 0). All of it is computed in SQL (LAG + ROW_NUMBER).
+        """
         family_key = family_key.strip()
         if not family_key:
             raise ValueError("family_key cannot be empty")
 
         rows = self.conn.execute(
+            """
+            WITH ranked AS (
+              SELECT
+                s.name AS store_name,
+                COALESCE(si.label_override, ci.label) AS display_label,
+                ci.size AS canonical_size,
+                ci.unit AS canonical_unit,
+                po.observed_on,
+                po.price_cents,
+                LAG(po.observed_on) OVER w AS prev_on,
+                LAG(po.price_cents) OVER w AS prev_cents,
+                ROW_NUMBER() OVER (PARTITION BY si.id ORDER BY po.observed_on DESC) AS rn
+              FROM price_observation po
+              JOIN store_item si ON si.id = po.store_item_id
+              JOIN store s ON s.id = si.store_id
+              JOIN canonical_item ci ON ci.id = si.canonical_item_id
+              WHERE ci.family_key = ?
+              WINDOW w AS (PARTITION BY si.id ORDER BY po.observed_on)
+            )
+            SELECT
+              store_name, display_label, canonical_size, canonical_unit,
+              observed_on, price_cents, prev_on, prev_cents,
+              CASE
+                WHEN prev_cents IS NULL THEN NULL
+                WHEN price_cents > prev_cents THEN '↑'
+                WHEN price_cents < prev_cents THEN '↓'
+                ELSE '→'
+              END AS arrow,
+              price_cents - prev_cents AS delta_cents,
+              -- same operation order as Python's delta / prev * 100.0, so rounding matches
+              CASE WHEN prev_cents > 0 THEN (price_cents - prev_cents) * 1.0 / prev_cents * 100.0 ELSE 0.0 END AS pct
+            FROM ranked
+            WHERE rn = 1
+            ORDER BY store_name ASC, canonical_unit ASC, canonical_size ASC
+            """,
+            (family_key,),
+        ).fetchall()
+        return [tuple(r) for r in rows]
+
+    def history_by_family_key(self, family_key: str) -> list[PricePoint]:
+        return list(self.iter_history_by_family_key(family_key))
+
+    def iter_history_by_family_key(self, family_key: str) -> Iterator[PricePoint]:
+        """Same rows as history_by_family_key, streamed from the cursor one at a time."""
+        family_key = family_key.strip()
+        if not family_key:
+            raise ValueError("family_key cannot be empty")
+
+        # columns are selected in PricePoint field order, so rows become PricePoints directly
+        cur = self.conn.cursor()
+        cur.row_factory = _price_point_row
+        cur.execute(
             """
             SELECT
               po.observed_on,
@@ -67,18 +173,6 @@ class ObservationRepo:
             ORDER BY po.observed_on ASC, s.name ASC, ci.unit ASC, ci.size ASC
             """,
             (family_key,),
-        ).fetchall()
+        )
 
-        return [
-            PricePoint(
-                observed_on=str(r["observed_on"]),
-                price_cents=int(r["price_cents"]),
-                store_name=str(r["store_name"]),
-                family_key=str(r["family_key"]),
-                canonical_label=str(r["canonical_label"]),
-                canonical_size=float(r["canonical_size"]),
-                canonical_unit=str(r["canonical_unit"]),
-                title_raw=(str(r["title_raw"]) if r["title_raw"] is not None else None),
-            )
-            for r in rows
-        ]
\ No newline at end of file
+        yield from cur
@@ -4,6 +4,8 @@ import sqlite3
 from dataclasses import dataclass
 from typing import Optional
 
+from price_tracker.scrapers import SCRAPER_NAMES
+
 
 @dataclass(frozen=True)
 class StoreItemForScrape:
@@ -18,6 +20,10 @@ class StoreItemForScrape:
     label_override: Optional[str]
 
 
+def _store_item_for_scrape_row(_cur: sqlite3.Cursor, row: tuple) -> StoreItemForScrape:
+    return StoreItemForScrape(*row)
+
+
 class StoreItemRepo:
     def __init__(self, conn: sqlite3.Connection) -> None:
         self.conn = conn
@@ -37,13 +43,15 @@ class StoreItemRepo:
             raise ValueError("url cannot be empty")
         if not scraper:
             raise ValueError("scraper cannot be empty")
+        if scraper not in SCRAPER_NAMES:
+            raise ValueError(f"unknown scraper: {scraper!r}")
 
         if label_override is not None:
             label_override = label_override.strip()
             if label_override == "":
                 label_override = None  # normalize empty -> NULL
 
-        self.conn.execute(
+        row = self.conn.execute(
             """
             INSERT INTO store_item(store_id, canonical_item_id, url, scraper, label_override)
             VALUES (?, ?, ?, ?, ?)
@@ -51,31 +59,30 @@ class StoreItemRepo:
               url=excluded.url,
               scraper=excluded.scraper,
               label_override=excluded.label_override
+            RETURNING id
             """,
             (int(store_id), int(canonical_item_id), url, scraper, label_override),
-        )
-
-        row = self.conn.execute(
-            "SELECT id FROM store_item WHERE store_id=? AND canonical_item_id=?",
-            (int(store_id), int(canonical_item_id)),
         ).fetchone()
         if row is None:
             raise RuntimeError("failed to fetch store_item after upsert")
         return int(row["id"])
 
     def list_for_scrape(self) -> list[StoreItemForScrape]:
-        rows = self.conn.execute(
+        # columns are selected in StoreItemForScrape field order, so rows become instances directly
+        cur = self.conn.cursor()
+        cur.row_factory = _store_item_for_scrape_row
+        return cur.execute(
             """
             SELECT
               si.id AS store_item_id,
               si.url,
               si.scraper,
-              si.label_override,
               s.name AS store_name,
               ci.family_key AS family_key,
               ci.label AS canonical_label,
               ci.size AS canonical_size,
-              ci.unit AS canonical_unit
+              ci.unit AS canonical_unit,
+              si.label_override
             FROM store_item si
             JOIN store s ON s.id = si.store_id
             JOIN canonical_item ci ON ci.id = si.canonical_item_id
@@ -83,21 +90,6 @@ class StoreItemRepo:
             """
         ).fetchall()
 
-        return [
-            StoreItemForScrape(
-                store_item_id=int(r["store_item_id"]),
-                url=str(r["url"]),
-                scraper=str(r["scraper"]),
-                store_name=str(r["store_name"]),
-                family_key=str(r["family_key"]),
-                canonical_label=str(r["canonical_label"]),
-                canonical_size=float(r["canonical_size"]),
-                canonical_unit=str(r["canonical_unit"]),
-                label_override=(str(r["label_override"]) if r["label_override"] is not None else None),
-            )
-            for r in rows
-        ]
-
     def get_by_url(self, url: str) -> dict | None:
         url = url.strip()
         if not url:
@@ -12,8 +12,11 @@ class StoreRepo:
         if not name:
             raise ValueError("store name cannot be empty")
 
-        self.conn.execute("INSERT OR IGNORE INTO store(name) VALUES (?)", (name,))
-        row = self.conn.execute("SELECT id FROM store WHERE name = ?", (name,)).fetchone()
+        # no-op update on conflict so RETURNING yields the existing id as well
+        row = self.conn.execute(
+            "INSERT INTO store(name) VALUES (?) ON CONFLICT(name) DO UPDATE SET name=excluded.name RETURNING id",
+            (name,),
+        ).fetchone()
         if row is None:
             raise RuntimeError("failed to fetch store after insert")
         return int(row["id"])
@@ -0,0 +1,2 @@
+# scraper keys stored in store_item.scraper; each is a module here with scrape(url, ...)
+SCRAPER_NAMES = ("hofer", "mercator", "lidl", "spar")
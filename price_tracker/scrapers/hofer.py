@@ -1,50 +1,44 @@
 from __future__ import annotations
 
 import re
-from decimal import Decimal
 from typing import Tuple
+from urllib.request import OpenerDirector
 
-from .html_utils import extract_title, fetch_html
+from .html_utils import extract_title, fetch_html, to_cents
 
 
-# ujame tudi NBSP in običajne presledke: "2,54 €"
-_PRICE_RE = re.compile(r"(\d{1,3}(?:\.\d{3})*,\d{2})\s*€", re.IGNORECASE)
+# en prehod čez HTML: primarni selector (kot v V1) ali katerakoli cena
+# (any ujame tudi NBSP in običajne presledke: "2,54 €")
+_PRIMARY_OR_ANY_RE = re.compile(
+    r'class="base-price__regular"[^>]*>\s*<span>\s*(?P<primary>[\d.,]+)\s*€\s*</span>'
+    r"|(?P<any>\d{1,3}(?:\.\d{3})*,\d{2})\s*€",
+    re.IGNORECASE,
+)
 
 
-def _to_decimal_eur(s: str) -> Decimal:
-    return Decimal(s.replace(".", "").replace(",", "."))
-
-
-def _eur_to_cents(d: Decimal) -> int:
-    cents = int((d * 100).quantize(Decimal("1")))
-    if cents < 0:
-        raise ValueError("negative price parsed")
-    return cents
+def _eur_str_to_cents(s: str) -> int:
+    # "1.234,56" -> 123456 (pika = tisočice, vejica = decimalke), brez Decimal
+    whole, _, frac = s.replace(".", "").partition(",")
+    return to_cents(whole, frac)
 
 
 def _extract_price_cents(html: str) -> int:
-    # Primarni selector (kot v V1)
-    m = re.search(
-        r'class="base-price__regular"[^>]*>\s*<span>\s*([\d.,]+)\s*€\s*</span>',
-        html,
-        re.IGNORECASE,
-    )
-    if m:
-        return _eur_to_cents(_to_decimal_eur(m.group(1)))
-
-    # Fallback: poberi vse cene v HTML
-    prices = _PRICE_RE.findall(html)
-    if not prices:
+    # Primarni selector ima prednost; sicer hevristika iz V1: zadnja cena je pogosto main price
+    last_any = None
+    for m in _PRIMARY_OR_ANY_RE.finditer(html):
+        primary = m.group("primary")
+        if primary is not None:
+            return _eur_str_to_cents(primary)
+        last_any = m.group("any")
+
+    if last_any is None:
         raise ValueError("Ne najdem cene v HTML (layout se je verjetno spremenil).")
 
-    dec_prices = [_to_decimal_eur(p) for p in prices]
-
-    # Hevristika iz V1: zadnja cena je pogosto main price
-    return _eur_to_cents(dec_prices[-1])
+    return _eur_str_to_cents(last_any)
 
 
-def scrape(url: str, *, verify_ssl: bool = True) -> Tuple[int, str]:
-    html = fetch_html(url, verify_ssl=verify_ssl)
+def scrape(url: str, *, verify_ssl: bool = True, opener: OpenerDirector | None = None) -> Tuple[int, str]:
+    html = fetch_html(url, verify_ssl=verify_ssl, opener=opener)
     title = extract_title(html)
     price_cents = _extract_price_cents(html)
     return price_cents, title
\ No newline at end of file
@@ -2,15 +2,61 @@ from __future__ import annotations
 
 import re
 import ssl
-from urllib.request import Request, urlopen
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.error import HTTPError, URLError
+from urllib.request import HTTPSHandler, OpenerDirector, Request
+from urllib.request import build_opener as _build_opener
 
 DEFAULT_HEADERS = {
     "User-Agent": "Mozilla/5.0 (price-tracker-v2; educational project)",
     "Accept-Language": "sl-SI,sl;q=0.9,en;q=0.8",
 }
 
+# fetch_bytes retry policy for transient errors
+_RETRIES = 3
+_BACKOFF_S = 0.3
+_RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+# 429/503 wait at least this long (matches the per-host pacing in app.py) and honour Retry-After
+# up to _MAX_RETRY_AFTER_S; a longer requested wait is not worth blocking a worker for
+_THROTTLED_MIN_DELAY_S = 1.0
+_MAX_RETRY_AFTER_S = 30.0
+# network errors worth another attempt; DNS failures, refused TLS verification etc. are permanent
+_TRANSIENT_ERRORS = (TimeoutError, ConnectionError)
 
-def fetch_html(url: str, timeout_s: int = 20, verify_ssl: bool = True) -> str:
+
+def _ssl_context(verify_ssl: bool) -> ssl.SSLContext:
+    if not verify_ssl:
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        return ctx
+
+    # try to use certifi if installed, otherwise fallback to system CA bundle
+    try:
+        import certifi  # type: ignore
+
+        return ssl.create_default_context(cafile=certifi.where())
+    except Exception:
+        return ssl.create_default_context()
+
+
+def build_opener(verify_ssl: bool = True) -> OpenerDirector:
+    """
+    Opener to share across many fetches (e.g. a whole scrape-all run):
+    the SSL context / CA bundle is loaded once instead of once per URL.
+    """
+    return _build_opener(HTTPSHandler(context=_ssl_context(verify_ssl)))
+
+
+def fetch_bytes(
+    url: str,
+    timeout_s: int = 20,
+    verify_ssl: bool = True,
+    opener: OpenerDirector | None = None,
+) -> bytes:
+    # verify_ssl is only used when no shared opener is passed (the opener carries its own SSL context)
     req = Request(
         url,
         headers={
@@ -19,42 +65,107 @@ def fetch_html(url: str, timeout_s: int = 20, verify_ssl: bool = True) -> str:
         },
     )
 
-    ctx = None
-    if not verify_ssl:
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-    else:
-        # try to use certifi if installed, otherwise fallback to system CA bundle
+    if opener is None:
+        opener = build_opener(verify_ssl)
+
+    # transient failures (timeouts, dropped connections, 429/5xx) are retried with exponential backoff
+    attempt = 0
+    while True:
+        delay = _BACKOFF_S * (2 ** attempt)
         try:
-            import certifi  # type: ignore
+            with opener.open(req, timeout=timeout_s) as resp:
+                return resp.read()
+        except HTTPError as e:
+            if e.code not in _RETRY_STATUS or attempt == _RETRIES:
+                raise
+            if e.code in (429, 503):
+                retry_after = _retry_after_s(e.headers.get("Retry-After") if e.headers else None)
+                if retry_after is not None and retry_after > _MAX_RETRY_AFTER_S:
+                    raise
+                delay = max(delay, _THROTTLED_MIN_DELAY_S, retry_after or 0.0)
+        except URLError as e:
+            if not isinstance(e.reason, _TRANSIENT_ERRORS) or attempt == _RETRIES:
+                raise
+        except _TRANSIENT_ERRORS:
+            if attempt == _RETRIES:
+                raise
+        time.sleep(delay)
+        attempt += 1
 
-            ctx = ssl.create_default_context(cafile=certifi.where())
-        except Exception:
-            ctx = ssl.create_default_context()
 
-    with urlopen(req, timeout=timeout_s, context=ctx) as resp:
-        return resp.read().decode("utf-8", errors="replace")
+def _retry_after_s(value: str | None) -> float | None:
+    # Retry-After is either delta-seconds or an HTTP-date
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdecimal():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def fetch_html(
+    url: str,
+    timeout_s: int = 20,
+    verify_ssl: bool = True,
+    opener: OpenerDirector | None = None,
+) -> str:
+    raw = fetch_bytes(url, timeout_s=timeout_s, verify_ssl=verify_ssl, opener=opener)
+    return raw.decode("utf-8", errors="replace")
+
+
+# "1.234,56 €" (dot = thousands, comma = decimals); shared by the mercator/spar price parsers
+EUR_PRICE_RE = re.compile(r"(\d{1,3}(?:\.\d{3})*,\d{2})\s*€")
+
+
+def to_cents(whole: str, frac: str) -> int:
+    # ("12", "5") -> 1250; more than 2 decimals round to the cent half-even (as Decimal.quantize did)
+    if not whole and not frac:
+        raise ValueError("empty price")
+    if len(frac) <= 2:
+        return int(whole or "0") * 100 + int(frac.ljust(2, "0"))
+    scale = 10 ** (len(frac) - 2)
+    q, r = divmod(int((whole or "0") + frac), scale)
+    if 2 * r > scale or (2 * r == scale and q % 2):
+        q += 1
+    return q
+
+
+# both attribute orders of the og:title meta tag in one pattern (one scan instead of two)
+_OG_TITLE_RE = re.compile(
+    r'<meta[^>]+(?:property=["\']og:title["\'][^>]+content=["\']([^"\']+)["\']'
+    r'|content=["\']([^"\']+)["\'][^>]+property=["\']og:title["\'])',
+    re.IGNORECASE,
+)
+_TITLE_RE = re.compile(r"<title>\s*(.*?)\s*</title>", re.IGNORECASE | re.DOTALL)
+_WS_RE = re.compile(r"\s+")
+
+
+_HEAD_END_RE = re.compile(r"</head\s*>", re.IGNORECASE)
+
+
+def _head(html: str) -> str:
+    # og:title / <title> live in <head>; don't scan (or match inline SVG <title>s in) the body
+    m = _HEAD_END_RE.search(html)
+    return html if m is None else html[: m.start()]
+
 
 def extract_title(html: str) -> str:
+    html = _head(html)
+
     # 1) og:title (atributi niso vedno v istem vrstnem redu)
-    m = re.search(
-        r'<meta[^>]+property=["\']og:title["\'][^>]+content=["\']([^"\']+)["\']',
-        html,
-        re.IGNORECASE,
-    )
-    if not m:
-        m = re.search(
-            r'<meta[^>]+content=["\']([^"\']+)["\'][^>]+property=["\']og:title["\']',
-            html,
-            re.IGNORECASE,
-        )
+    m = _OG_TITLE_RE.search(html)
     if m:
-        return m.group(1).strip()
+        return (m.group(1) or m.group(2)).strip()
 
     # 2) <title> fallback
-    m = re.search(r"<title>\s*(.*?)\s*</title>", html, re.IGNORECASE | re.DOTALL)
+    m = _TITLE_RE.search(html)
     if m:
-        return re.sub(r"\s+", " ", m.group(1)).strip()
+        return _WS_RE.sub(" ", m.group(1)).strip()
 
-    return "(unknown title)"
\ No newline at end of file
+    return "(unknown title)"
@@ -1,30 +1,24 @@
 from __future__ import annotations
 
 import re
-from decimal import Decimal
 from typing import Tuple
+from urllib.request import OpenerDirector
 
-from .html_utils import extract_title, fetch_html
+from .html_utils import extract_title, fetch_html, to_cents
 
 
 # ujame "5.29€", "5.29 €", "5,29€", tudi z zvezdico
 _PRICE_RE = re.compile(r"(\d{1,3}(?:[.,]\d{3})*[.,]\d{2})\s*€\*?", re.IGNORECASE)
 
 
-def _to_decimal_eur(s: str) -> Decimal:
-    # "5.29" or "5,29" -> Decimal("5.29")
-    s = s.replace(".", "").replace(",", ".") if "," in s else s
-    # če je format "1.234,56" -> prej odstrani tisočice
-    s = s.replace(".", "") if re.match(r"^\d{1,3}(?:\.\d{3})+,\d{2}$", s) else s
-    s = s.replace(",", ".")
-    return Decimal(s)
-
-
-def _eur_to_cents(d: Decimal) -> int:
-    cents = int((d * 100).quantize(Decimal("1")))
-    if cents < 0:
-        raise ValueError("negative price parsed")
-    return cents
+def _eur_str_to_cents(s: str) -> int:
+    # "5.29" / "5,29" -> 529; z vejico so pike tisočice ("1.234,56" -> 123456), brez Decimal
+    if "," in s:
+        s = s.replace(".", "").replace(",", ".")
+    whole, _, frac = s.partition(".")
+    if "." in frac:
+        raise ValueError(f"invalid price: {s!r}")
+    return to_cents(whole, frac)
 
 
 def _extract_price_cents(html: str) -> int:
@@ -32,14 +26,12 @@ def _extract_price_cents(html: str) -> int:
     if not prices:
         raise ValueError("Ne najdem cene v HTML (layout se je verjetno spremenil).")
 
-    dec_prices = [_to_decimal_eur(p) for p in prices]
-
     # Lidl pogosto prikaže staro (višjo) in novo (nižjo) ceno -> vzamemo minimum.
-    return _eur_to_cents(min(dec_prices))
+    return min(_eur_str_to_cents(p) for p in prices)
 
 
-def scrape(url: str, *, verify_ssl: bool = True) -> Tuple[int, str]:
-    html = fetch_html(url, verify_ssl=verify_ssl)
+def scrape(url: str, *, verify_ssl: bool = True, opener: OpenerDirector | None = None) -> Tuple[int, str]:
+    html = fetch_html(url, verify_ssl=verify_ssl, opener=opener)
     title = extract_title(html)
     price_cents = _extract_price_cents(html)
     return price_cents, title
\ No newline at end of file
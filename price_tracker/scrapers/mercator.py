@@ -1,50 +1,14 @@
 from __future__ import annotations
 
-import re
-from decimal import Decimal
 from typing import Tuple
+from urllib.request import OpenerDirector
 
-from .html_utils import fetch_html
+from .html_utils import EUR_PRICE_RE as _PRICE_RE, extract_title as _extract_title, fetch_html
 
 
-_PRICE_RE = re.compile(r"(\d{1,3}(?:\.\d{3})*,\d{2})\s*€", re.IGNORECASE)
-
-
-def _to_decimal_eur(s: str) -> Decimal:
-    # "11,99" -> Decimal("11.99")
-    return Decimal(s.replace(".", "").replace(",", "."))
-
-
-def _eur_to_cents(d: Decimal) -> int:
-    # safe rounding to cents
-    cents = int((d * 100).quantize(Decimal("1")))
-    if cents < 0:
-        raise ValueError("negative price parsed")
-    return cents
-
-
-def _extract_title(html: str) -> str:
-    # 1) og:title (atributi niso vedno v istem vrstnem redu)
-    m = re.search(
-        r'<meta[^>]+property=["\']og:title["\'][^>]+content=["\']([^"\']+)["\']',
-        html,
-        re.IGNORECASE,
-    )
-    if not m:
-        m = re.search(
-            r'<meta[^>]+content=["\']([^"\']+)["\'][^>]+property=["\']og:title["\']',
-            html,
-            re.IGNORECASE,
-        )
-    if m:
-        return m.group(1).strip()
-
-    # 2) <title> fallback
-    m = re.search(r"<title>\s*(.*?)\s*</title>", html, re.IGNORECASE | re.DOTALL)
-    if m:
-        return re.sub(r"\s+", " ", m.group(1)).strip()
-
-    return "(unknown title)"
+def _eur_str_to_cents(s: str) -> int:
+    # "1.234,56" -> 123456: _PRICE_RE zagotavlja točno 2 decimalki, zato brez Decimal
+    return int(s.replace(".", "").replace(",", ""))
 
 
 def _extract_price_cents(html: str) -> int:
@@ -55,18 +19,16 @@ def _extract_price_cents(html: str) -> int:
     if idx == -1:
         raise ValueError("Na strani ne najdem 'Cena na enoto' bloka (layout se je verjetno spremenil).")
 
-    tail = html[idx : idx + 2000]
-    prices = _PRICE_RE.findall(tail)
+    # pos/endpos omeji iskanje na okno brez kopiranja 2000-znakovnega izseka
+    prices = _PRICE_RE.findall(html, idx, idx + 2000)
     if not prices:
         raise ValueError("Ne najdem cen v HTML (layout se je verjetno spremenil).")
 
-    dec_prices = [_to_decimal_eur(p) for p in prices]
-    main_price = min(dec_prices)
-    return _eur_to_cents(main_price)
+    return min(_eur_str_to_cents(p) for p in prices)
 
 
-def scrape(url: str, *, verify_ssl: bool = True) -> Tuple[int, str]:
-    html = fetch_html(url, verify_ssl=verify_ssl)
+def scrape(url: str, *, verify_ssl: bool = True, opener: OpenerDirector | None = None) -> Tuple[int, str]:
+    html = fetch_html(url, verify_ssl=verify_ssl, opener=opener)
     title = _extract_title(html)
     price_cents = _extract_price_cents(html)
     return price_cents, title
\ No newline at end of file
@@ -2,54 +2,59 @@ from __future__ import annotations
 
 import json
 import re
-from urllib.parse import urlparse
+from urllib.request import OpenerDirector
 
-from .html_utils import fetch_html
+from .html_utils import EUR_PRICE_RE as _PRICE_EUR_RE, extract_title, fetch_bytes, to_cents
 
+# orjson (C, SIMD) if installed, otherwise the stdlib parser; both raise ValueError subclasses
+try:
+    from orjson import loads as _json_loads  # type: ignore
+except ImportError:
+    _json_loads = json.loads
 
-_PRICE_EUR_RE = re.compile(r"(\d{1,3}(?:\.\d{3})*,\d{2})\s*€")
 _LD_JSON_RE = re.compile(
     r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>',
     re.IGNORECASE | re.DOTALL,
 )
-_URL_ID_RE = re.compile(r"-(\d+)$")
 
 
 def _to_cents_from_eur_str(eur: str) -> int:
-    eur = eur.replace(".", "").replace(",", ".").strip()
-    return int(round(float(eur) * 100))
-
-
-def _extract_title_from_html(html: str) -> str:
-    m = re.search(
-        r'<meta[^>]+property=["\']og:title["\'][^>]+content=["\']([^"\']+)["\']',
-        html,
-        re.IGNORECASE,
-    )
-    if not m:
-        m = re.search(
-            r'<meta[^>]+content=["\']([^"\']+)["\'][^>]+property=["\']og:title["\']',
-            html,
-            re.IGNORECASE,
-        )
-    if m:
-        return m.group(1).strip()
-
-    m = re.search(r"<title>\s*(.*?)\s*</title>", html, re.IGNORECASE | re.DOTALL)
-    if m:
-        return re.sub(r"\s+", " ", m.group(1)).strip()
-
-    return "(unknown title)"
+    # "1.234,56" -> 123456: _PRICE_EUR_RE zagotavlja točno 2 decimalki, zato brez float
+    return int(eur.replace(".", "").replace(",", ""))
+
+
+def _price_to_cents(price: object) -> int:
+    # JSON cena: "11.99" / "11,99" gre po celoštevilski poti, števila in ostalo prek float kot prej
+    if isinstance(price, str):
+        price = price.strip()
+        # "1.234,56": pike so tisočice (brez regexa, le položaj ločil)
+        if "," in price and "." in price and price.rindex(".") < price.rindex(","):
+            price = price.replace(".", "")
+        whole, sep, frac = price.replace(",", ".").partition(".")
+        if whole.isdecimal() and (not sep or frac.isdecimal()):
+            return to_cents(whole, frac)
+    elif type(price) is int:  # cele evre (JSON 12): točno, brez float
+        return price * 100
+    elif type(price) is float:
+        return int(round(price * 100))
+    return int(round(float(str(price).replace(",", ".")) * 100))
 
 
 def _extract_product_id(url: str) -> str | None:
-    path = urlparse(url).path.strip("/")
-    last = path.split("/")[-1]
-    m = _URL_ID_RE.search(last)
-    return m.group(1) if m else None
-
-
-def _try_parse_search_api_json(raw: str, product_url: str) -> tuple[int, str] | None:
+    # ".../ime-izdelka-131036" -> "131036"; string ops only (isdecimal == regex \d)
+    # pot brez urlparse: odreži #fragment, ?query, http(s)://host in ;params zadnjega segmenta
+    path = url.partition("#")[0].partition("?")[0]
+    if path.startswith(("https://", "http://")):
+        path = path.partition("://")[2].partition("/")[2]
+    semi = path.find(";", path.rfind("/") + 1)
+    if semi != -1:
+        path = path[:semi]
+    last = path.strip("/").rpartition("/")[2]
+    _, sep, tail = last.rpartition("-")
+    return tail if sep and tail.isdecimal() else None
+
+
+def _try_parse_search_api_json(raw: bytes | str, product_url: str) -> tuple[int, str] | None:
     """
     Backward-compatible parser for old SPAR search API test fixture:
     {
@@ -66,7 +71,7 @@ def _try_parse_search_api_json(raw: str, product_url: str) -> tuple[int, str] |
     }
     """
     try:
-        data = json.loads(raw)
+        data = _json_loads(raw)
     except Exception:
         return None
 
@@ -80,7 +85,11 @@ def _try_parse_search_api_json(raw: str, product_url: str) -> tuple[int, str] |
     chosen = None
     if wanted_id is not None:
         for hit in hits:
-            if isinstance(hit, dict) and str(hit.get("id")) == wanted_id:
+            if not isinstance(hit, dict):
+                continue
+            # id je običajno že niz; str() samo za številske id-je
+            hid = hit.get("id")
+            if hid == wanted_id or (type(hid) is int and str(hid) == wanted_id):
                 chosen = hit
                 break
 
@@ -102,7 +111,7 @@ def _try_parse_search_api_json(raw: str, product_url: str) -> tuple[int, str] |
         return None
 
     try:
-        cents = int(round(float(str(price).replace(",", ".")) * 100))
+        cents = _price_to_cents(price)
     except Exception:
         return None
 
@@ -119,7 +128,7 @@ def _try_parse_price_from_ldjson(html: str) -> tuple[int, str] | None:
         if not raw:
             continue
         try:
-            obj = json.loads(raw)
+            obj = _json_loads(raw)
         except Exception:
             continue
 
@@ -142,8 +151,7 @@ def _try_parse_price_from_ldjson(html: str) -> tuple[int, str] | None:
                     continue
 
                 try:
-                    price_f = float(str(price).replace(",", "."))
-                    price_cents = int(round(price_f * 100))
+                    price_cents = _price_to_cents(price)
                 except Exception:
                     continue
 
@@ -163,20 +171,28 @@ def _try_parse_price_from_html_text(html: str) -> int | None:
     return min(cents) if cents else None
 
 
-def scrape(url: str, timeout_s: int = 20, verify_ssl: bool = True) -> tuple[int, str]:
-    raw = fetch_html(url, timeout_s=timeout_s, verify_ssl=verify_ssl)
+def scrape(
+    url: str,
+    timeout_s: int = 20,
+    verify_ssl: bool = True,
+    opener: OpenerDirector | None = None,
+) -> tuple[int, str]:
+    # surove bajte dobi JSON parser neposredno; dekodiramo šele, ko rabimo HTML
+    raw = fetch_bytes(url, timeout_s=timeout_s, verify_ssl=verify_ssl, opener=opener)
 
     # 1) old search API JSON shape (keeps tests green)
     api = _try_parse_search_api_json(raw, url)
     if api:
         return api
 
+    raw = raw.decode("utf-8", errors="replace")
+
     # 2) JSON-LD in HTML
     ld = _try_parse_price_from_ldjson(raw)
     if ld:
         return ld
 
-    title = _extract_title_from_html(raw)
+    title = extract_title(raw)
     cents = _try_parse_price_from_html_text(raw)
     if cents is not None:
         return cents, title
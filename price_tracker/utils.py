@@ -1,7 +1,37 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Optional, Tuple
 
+# unit -> (divisor from pack size to normalized size, normalized unit)
+_NORM: dict[str, tuple[float, str]] = {
+    "l": (1.0, "l"),
+    "ml": (1000.0, "l"),
+    "kg": (1.0, "kg"),
+    "g": (1000.0, "kg"),
+    "pcs": (1.0, "pcs"),
+    "kos": (1.0, "pcs"),
+}
+
+
+@lru_cache(maxsize=1024)  # few distinct packs, looked up once per row
+def normalized_quantity(size: float, unit: str) -> Optional[Tuple[float, str]]:
+    """
+    Returns (pack size in normalized units, normalized_unit)
+    e.g. (0.75, 'l') for 750 ml; None for unsupported units.
+    """
+
+    if size <= 0:
+        return None
+
+    # units from the DB are normally lowercase already; lower() only on a miss
+    norm = _NORM.get(unit) or _NORM.get(unit.lower())
+    if norm is None:
+        return None
+
+    div, norm_unit = norm
+    return size / div, norm_unit
+
 
 def compute_normalized_unit_price(
     price_cents: int,
@@ -13,25 +43,27 @@ def compute_normalized_unit_price(
     e.g. (5.29, 'l') or (8.45, 'kg')
     """
 
-    if price_cents is None or size <= 0:
+    if price_cents is None:
         return None
 
-    eur = price_cents / 100.0
-    unit = unit.lower()
-
-    if unit == "l":
-        return eur / size, "l"
-
-    if unit == "ml":
-        return eur / (size / 1000.0), "l"
-
-    if unit == "kg":
-        return eur / size, "kg"
+    q = normalized_quantity(size, unit)
+    if q is None:
+        return None
 
-    if unit == "g":
-        return eur / (size / 1000.0), "kg"
+    qty, norm_unit = q
+    return price_cents / 100.0 / qty, norm_unit
 
-    if unit == "pcs":
-        return eur / size, "pcs"
 
-    return None
\ No newline at end of file
+def normalized_unit_price_sql(price_col: str, size_col: str, unit_col: str) -> Tuple[str, str]:
+    """
+    SQL CASE expressions (norm_val, norm_unit) generated from _NORM, with the same arithmetic as
+    compute_normalized_unit_price; unsupported units fall back to the pack price and unit.
+    """
+    val_cases = "\n".join(
+        f"WHEN '{unit}' THEN {price_col} / 100.0 / ({size_col} / {div!r})" for unit, (div, _) in _NORM.items()
+    )
+    unit_cases = "\n".join(f"WHEN '{unit}' THEN '{norm_unit}'" for unit, (_, norm_unit) in _NORM.items())
+    return (
+        f"CASE LOWER({unit_col})\n{val_cases}\nELSE {price_col} / 100.0\nEND",
+        f"CASE LOWER({unit_col})\n{unit_cases}\nELSE {unit_col}\nEND",
+    )
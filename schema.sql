@@ -43,6 +43,11 @@ CREATE TABLE IF NOT EXISTS store_item (
   UNIQUE (url)
 );
 
+-- family queries go canonical_item -> store_item, so lead with canonical_item_id
+-- (the UNIQUE(store_id, canonical_item_id) index can't serve that join)
+CREATE INDEX IF NOT EXISTS idx_store_item_canonical
+  ON store_item(canonical_item_id, store_id);
+
 -- =========================
 -- PRICE OBSERVATION (1 zapis na dan na store_item)
 -- =========================
@@ -60,5 +65,9 @@ CREATE TABLE IF NOT EXISTS price_observation (
   UNIQUE (store_item_id, observed_on)
 );
 
-CREATE INDEX IF NOT EXISTS idx_obs_item_date
-  ON price_observation(store_item_id, observed_on);
\ No newline at end of file
+-- covering index for "latest observation per store_item" lookups:
+-- MAX(observed_on) is a single seek and price_cents is read from the index
+DROP INDEX IF EXISTS idx_obs_item_date;
+
+CREATE INDEX IF NOT EXISTS idx_obs_item_date_price
+  ON price_observation(store_item_id, observed_on DESC, price_cents);
\ No newline at end of file
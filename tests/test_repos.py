@@ -0,0 +1,134 @@
+from pathlib import Path
+
+import pytest
+
+SCHEMA = str(Path(__file__).resolve().parents[1] / "schema.sql")
+
+
+@pytest.fixture
+def conn():
+    from price_tracker.db import connect, init_db
+
+    c = connect(":memory:")
+    init_db(c, SCHEMA)
+    yield c
+    c.close()
+
+
+def _track(conn, store="Spar", key="milk", size=1.0, unit="l", url="https://example.com/1", scraper="spar"):
+    from price_tracker.db import transaction
+    from price_tracker.repos import CanonicalItemRepo, StoreItemRepo, StoreRepo
+
+    with transaction(conn):
+        store_id = StoreRepo(conn).get_or_create(store)
+        canonical_id = CanonicalItemRepo(conn).upsert(key, key.title(), size, unit)
+        return StoreItemRepo(conn).upsert_mapping(store_id, canonical_id, url, scraper)
+
+
+def test_insert_daily_many_ignores_existing_days(conn):
+    from price_tracker.db import transaction
+    from price_tracker.repos import ObservationRepo
+
+    si1 = _track(conn, url="https://example.com/1")
+    si2 = _track(conn, store="Hofer", url="https://example.com/2")
+    repo = ObservationRepo(conn)
+
+    with transaction(conn):
+        assert repo.insert_daily_many([(si1, "2026-01-01", 100, "a")]) == 1
+
+    with transaction(conn):
+        n = repo.insert_daily_many(
+            [
+                (si1, "2026-01-01", 999, "dup"),
+                (si2, "2026-01-01", 120, None),
+            ]
+        )
+
+    assert n == 1
+    assert repo.observed_store_item_ids("2026-01-01") == {si1, si2}
+    assert repo.insert_daily_many([]) == 0
+
+    # generator input spanning several chunks
+    with transaction(conn):
+        n = repo.insert_daily_many(((si1, f"2025-12-{d:02d}", d, None) for d in range(1, 8)), chunk=3)
+    assert n == 7
+
+    # one bad row rolls back the whole batch
+    with pytest.raises(ValueError):
+        with transaction(conn):
+            repo.insert_daily_many([(si1, "2026-01-02", 100, None), (si2, "2026-01-02", -1, None)])
+    assert repo.observed_store_item_ids("2026-01-02") == set()
+
+
+def test_upserts_return_existing_ids(conn):
+    from price_tracker.db import transaction
+    from price_tracker.repos import CanonicalItemRepo, StoreItemRepo, StoreRepo
+
+    with transaction(conn):
+        store_id = StoreRepo(conn).get_or_create("Spar")
+        cid = CanonicalItemRepo(conn).upsert("milk", "Milk", 1, "l")
+        si_id = StoreItemRepo(conn).upsert_mapping(store_id, cid, "https://example.test/milk", "spar")
+
+    with transaction(conn):
+        assert StoreRepo(conn).get_or_create("Spar") == store_id
+        assert CanonicalItemRepo(conn).upsert("milk", "Fresh milk", 1, "l") == cid
+        assert StoreItemRepo(conn).upsert_mapping(store_id, cid, "https://example.test/milk2", " Spar ") == si_id
+        with pytest.raises(ValueError):
+            StoreItemRepo(conn).upsert_mapping(store_id, cid, "https://example.test/milk3", "tus")
+
+    assert CanonicalItemRepo(conn).get_by_family_size_unit("milk", 1, "l")["label"] == "Fresh milk"
+
+
+def test_trend_by_family_key(conn):
+    from price_tracker.db import transaction
+    from price_tracker.repos import ObservationRepo
+
+    si = _track(conn)
+    repo = ObservationRepo(conn)
+    with transaction(conn):
+        repo.insert_daily_many([(si, "2026-01-01", 100, None)])
+
+    assert repo.trend_by_family_key("milk") == [
+        ("Spar", "Milk", 1.0, "l", "2026-01-01", 100, None, None, None, None, 0.0)
+    ]
+
+    with transaction(conn):
+        repo.insert_daily_many([(si, f"2026-01-0{d}", 100 + d, None) for d in (2, 3)])
+
+    assert repo.trend_by_family_key("milk") == [
+        ("Spar", "Milk", 1.0, "l", "2026-01-03", 103, "2026-01-02", 102, "↑", 1, 1 / 102 * 100.0)
+    ]
+
+
+def test_connect_read_only_applies_schema_then_rejects_writes(tmp_path):
+    import sqlite3
+
+    from price_tracker.db import SCHEMA_VERSION, connect_read_only
+
+    c = connect_read_only(str(tmp_path / "prices.sqlite"), SCHEMA)
+    assert c.execute("PRAGMA user_version;").fetchone()[0] == SCHEMA_VERSION
+    with pytest.raises(sqlite3.OperationalError):
+        c.execute("INSERT INTO store(name) VALUES ('Spar')")
+    c.close()
+
+
+def test_cheapest_sql_normalization_matches_utils(conn):
+    import app
+    from price_tracker.db import transaction
+    from price_tracker.repos import ObservationRepo
+    from price_tracker.utils import _NORM, compute_normalized_unit_price
+
+    units = list(_NORM) + [u.upper() for u in _NORM] + ["pak"]
+    repo = ObservationRepo(conn)
+    for i, unit in enumerate(units):
+        si = _track(conn, store=f"S{i}", size=750.0, unit=unit, url=f"https://example.com/{i}")
+        with transaction(conn):
+            repo.insert_daily_many([(si, "2026-01-01", 1199, None)])
+
+    rows = conn.execute(app._CHEAPEST_SQL, ("milk",)).fetchall()
+    assert len(rows) == len(units)
+    for r in rows:
+        expected = compute_normalized_unit_price(r["price_cents"], r["canonical_size"], r["canonical_unit"])
+        if expected is None:  # unsupported unit: pack price
+            expected = (r["price_cents"] / 100.0, r["canonical_unit"])
+        assert (r["norm_val"], r["norm_unit"]) == expected
@@ -46,6 +46,31 @@ def test_hofer_extract_title_and_price_primary_selector():
     assert h._extract_price_cents(html) == 749
 
 
+def test_hofer_extract_price_falls_back_to_last_generic_price():
+    from price_tracker.scrapers import hofer as h
+
+    html = """
+    <div class="price">3,99 €</div>
+    <div class="unit">1.299,00 € / kg</div>
+    <div class="main">2,54\u00a0€</div>
+    """
+
+    assert h._extract_price_cents(html) == 254
+
+
+def test_hofer_extract_price_primary_wins_even_after_other_prices():
+    from price_tracker.scrapers import hofer as h
+
+    html = """
+    <div class="teaser">1,11 €</div>
+    <div class="unit">9,99 € / l</div>
+    <div class="base-price__regular"><span> 7,49 € </span></div>
+    <div class="other">0,50 €</div>
+    """
+
+    assert h._extract_price_cents(html) == 749
+
+
 def test_lidl_extract_price_min_of_multiple_prices():
     from price_tracker.scrapers import lidl as l
 
@@ -80,12 +105,143 @@ def test_spar_scrape_via_search_api(monkeypatch):
         ]
     }
 
-    def fake_fetch_html(url: str, *args, **kwargs) -> str:
-        return json.dumps(fake)
+    def fake_fetch_bytes(url: str, *args, **kwargs) -> bytes:
+        return json.dumps(fake).encode("utf-8")
 
-    # spar.py uses `from .html_utils import fetch_html` => patch module-local name
-    monkeypatch.setattr(s, "fetch_html", fake_fetch_html)
+    # spar.py uses `from .html_utils import fetch_bytes` => patch module-local name
+    monkeypatch.setattr(s, "fetch_bytes", fake_fetch_bytes)
 
     price_cents, title = s.scrape(product_url, verify_ssl=True)
     assert price_cents == 1199
-    assert "Monini" in title
\ No newline at end of file
+    assert "Monini" in title
+
+
+@pytest.mark.parametrize(
+    "price, cents",
+    [
+        ("11.99", 1199),
+        ("11,99", 1199),
+        ("1.234,56", 123456),  # EU thousands separator
+        (" 7 ", 700),
+        ("2.675", 268),  # string path: exact half-even on the decimal digits
+        (12, 1200),  # int path: exact
+        (11.99, 1199),
+        # float path rounds the binary value (1.005 * 100 == 100.49999...), as before
+        (1.005, 100),
+        (2.675, 268),
+        ("1e2", 10000),  # fallback through float()
+        ("-1.5", -150),
+    ],
+)
+def test_spar_price_to_cents(price, cents):
+    from price_tracker.scrapers import spar as s
+
+    assert s._price_to_cents(price) == cents
+
+
+@pytest.mark.parametrize("price", ["12.5x", "", True, None])
+def test_spar_price_to_cents_rejects_garbage(price):
+    from price_tracker.scrapers import spar as s
+
+    with pytest.raises(ValueError):
+        s._price_to_cents(price)
+
+
+def test_extract_title_ignores_body_svg_titles():
+    from price_tracker.scrapers.html_utils import extract_title
+
+    html = """
+    <html>
+      <head><meta name="x" content="y"/></head>
+      <body><svg><title>Close</title></svg></body>
+    </html>
+    """
+
+    assert extract_title(html) == "(unknown title)"
+
+
+@pytest.mark.parametrize("head_end", ["</Head>", "</head >", "</HEAD\n>"])
+def test_extract_title_head_end_is_case_and_space_insensitive(head_end):
+    from price_tracker.scrapers.html_utils import extract_title
+
+    html = f"<html><head><meta name='x' content='y'/>{head_end}<body><svg><title>Close</title></svg></body></html>"
+
+    assert extract_title(html) == "(unknown title)"
+
+
+def test_spar_extract_product_id():
+    from price_tracker.scrapers import spar as s
+
+    assert s._extract_product_id("https://online.spar.si/p/monini-750ml-131036/?x=1") == "131036"
+    assert s._extract_product_id("https://online.spar.si/p/monini-750ml") is None
+    assert s._extract_product_id("https://online.spar.si/p/131036") is None
+
+
+def test_fetch_bytes_does_not_retry_permanent_errors(monkeypatch):
+    import socket
+    from urllib.error import URLError
+
+    from price_tracker.scrapers import html_utils
+
+    calls = []
+
+    class FakeOpener:
+        def open(self, req, timeout=None):
+            calls.append(req.full_url)
+            if len(calls) == 1:
+                raise URLError(TimeoutError("timed out"))
+            raise URLError(socket.gaierror(-2, "Name or service not known"))
+
+    monkeypatch.setattr(html_utils.time, "sleep", lambda s: None)
+
+    with pytest.raises(URLError):
+        html_utils.fetch_bytes("https://nonexistent.invalid/", opener=FakeOpener())
+    # the timeout is retried once, the DNS failure is raised immediately
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize(
+    "whole, frac, cents",
+    [
+        ("12", "", 1200),
+        ("5", "5", 550),  # 1-digit fraction
+        ("11", "99", 1199),
+        ("", "5", 50),
+        ("1", "015", 102),  # 3 digits: exact tie rounds to even (101.5 -> 102)
+        ("1", "005", 100),  # 100.5 -> 100
+        ("2", "675", 268),
+        ("0", "1251", 13),  # above the tie rounds up
+    ],
+)
+def test_to_cents_rounds_half_even_like_decimal(whole, frac, cents):
+    from decimal import ROUND_HALF_EVEN, Decimal
+
+    from price_tracker.scrapers.html_utils import to_cents
+
+    assert to_cents(whole, frac) == cents
+    expected = (Decimal(f"{whole or 0}.{frac or 0}") * 100).quantize(Decimal("1"), rounding=ROUND_HALF_EVEN)
+    assert to_cents(whole, frac) == int(expected)
+
+
+def test_eur_str_to_cents_thousands_and_malformed():
+    from price_tracker.scrapers import hofer as h, lidl as l, mercator as m
+    from price_tracker.scrapers.html_utils import to_cents
+
+    assert h._eur_str_to_cents("1.234,56") == 123456
+    assert l._eur_str_to_cents("1.234,56") == 123456
+    assert l._eur_str_to_cents("1234.56") == 123456
+    assert m._eur_str_to_cents("1.234,56") == 123456
+    assert h._eur_str_to_cents("7,495") == 750
+    assert l._eur_str_to_cents("7.485") == 748
+
+    malformed = [
+        (h._eur_str_to_cents, ""),
+        (h._eur_str_to_cents, "abc"),
+        (l._eur_str_to_cents, "1.2.3"),
+        (m._eur_str_to_cents, "x,yz"),
+    ]
+    for fn, bad in malformed:
+        with pytest.raises(ValueError):
+            fn(bad)
+    with pytest.raises(ValueError):
+        to_cents("", "")
@@ -0,0 +1,29 @@
+import pytest
+
+
+def test_compute_normalized_unit_price_units():
+    from price_tracker.utils import compute_normalized_unit_price as norm
+
+    assert norm(529, 1, "l") == (5.29, "l")
+    assert norm(399, 750, "ml") == pytest.approx((5.32, "l"), abs=1e-9)
+    assert norm(254, 250, "g") == (10.16, "kg")
+    assert norm(300, 10, "pcs") == (0.3, "pcs")
+    assert norm(300, 10, "kos") == (0.3, "pcs")
+
+    # units stored with different casing still normalize
+    assert norm(100, 0.5, "L") == (2.0, "l")
+
+
+def test_compute_normalized_unit_price_unsupported():
+    from price_tracker.utils import compute_normalized_unit_price as norm
+
+    assert norm(100, 1, "box") is None
+    assert norm(100, 0, "l") is None
+
+
+def test_normalized_quantity():
+    from price_tracker.utils import normalized_quantity
+
+    assert normalized_quantity(750, "ml") == (0.75, "l")
+    assert normalized_quantity(10, "kos") == (10.0, "pcs")
+    assert normalized_quantity(1, "box") is None
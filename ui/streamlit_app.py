@@ -139,7 +139,7 @@ def store_item_upsert_mapping(
     - UNIQUE(url) enforced
     """
     url = url.strip()
-    scraper = scraper.strip()
+    scraper = scraper.strip().lower()
     if not url:
         raise ValueError("URL (--url) is required.")
     if not scraper: